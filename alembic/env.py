@@ -24,8 +24,15 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
-from models.models import User
+from models.models import User, TICKET_DEFAULT_PARTITION, TICKET_PARTITION_PREFIX
 target_metadata = User.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Секции tickets создаются create_lottery и не описаны в моделях: autogenerate не должен их удалять
+    if type_ == "table" and reflected and compare_to is None:
+        return not (name.startswith(TICKET_PARTITION_PREFIX) or name == TICKET_DEFAULT_PARTITION)
+    return True
 # target_metadata = None
 
 # other values from the config, defined by the needs of env.py,
@@ -72,7 +79,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
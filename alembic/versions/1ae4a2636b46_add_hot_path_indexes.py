@@ -0,0 +1,55 @@
+"""Add hot path indexes
+
+Revision ID: 1ae4a2636b46
+Revises: a3066152bd0f
+Create Date: 2026-10-18 17:02:11.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1ae4a2636b46'
+down_revision: Union[str, None] = 'a3066152bd0f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не может выполняться внутри транзакции.
+    # Если построение прервётся, в БД останется индекс с пометкой INVALID — его нужно удалить
+    # и повторить миграцию
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tickets_lottery_id_ticket_number',
+            'tickets',
+            ['lottery_id', 'ticket_number'],
+            unique=False,
+            postgresql_include=['user_id'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_tickets_lottery_id_user_id',
+            'tickets',
+            ['lottery_id', 'user_id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_lotteries_name_id',
+            'lotteries',
+            ['name'],
+            unique=False,
+            postgresql_include=['id'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_lotteries_name_id', table_name='lotteries', postgresql_concurrently=True)
+        op.drop_index('ix_tickets_lottery_id_user_id', table_name='tickets', postgresql_concurrently=True)
+        op.drop_index('ix_tickets_lottery_id_ticket_number', table_name='tickets', postgresql_concurrently=True)
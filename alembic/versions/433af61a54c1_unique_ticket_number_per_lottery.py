@@ -0,0 +1,63 @@
+"""Unique ticket number per lottery
+
+Revision ID: 433af61a54c1
+Revises: 62f37abc5b96
+Create Date: 2026-10-18 21:05:44.127930
+
+Индекс ix_tickets_lottery_id_ticket_number становится уникальным: одинаковый номер билета
+в одной лотерее отклоняет сама БД, а не только ticket_allocator. Ключ секционирования
+lottery_id входит в индекс, поэтому уникальность проверяется по всей таблице.
+Секционированную таблицу нельзя индексировать CONCURRENTLY: миграция блокирует запись
+в tickets на время построения индекса.
+
+Счётчики ticket_counters сверяются с выданными билетами: лотерея без счётчика получает его,
+а счётчик, отставший от наибольшего номера, догоняет его. Иначе ticket_allocator выдал бы
+номер, который теперь отклонит уникальный индекс.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '433af61a54c1'
+down_revision: Union[str, None] = '62f37abc5b96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(sa.text(
+            "SELECT lottery_id, ticket_number FROM tickets "
+            "GROUP BY lottery_id, ticket_number HAVING count(*) > 1 LIMIT 10"
+        )).all()
+        if duplicates:
+            raise RuntimeError(
+                "В tickets есть повторяющиеся номера (lottery_id, ticket_number), например "
+                f"{duplicates}; их нужно перенумеровать до миграции"
+            )
+
+    op.execute(
+        """
+        INSERT INTO ticket_counters (lottery_id, last_number)
+        SELECT lottery_id, MAX(ticket_number)
+        FROM tickets
+        WHERE lottery_id IS NOT NULL
+        GROUP BY lottery_id
+        ON CONFLICT (lottery_id)
+        DO UPDATE SET last_number = GREATEST(ticket_counters.last_number, EXCLUDED.last_number)
+        """
+    )
+
+    op.drop_index('ix_tickets_lottery_id_ticket_number', table_name='tickets')
+    op.create_index('ix_tickets_lottery_id_ticket_number', 'tickets', ['lottery_id', 'ticket_number'],
+                    unique=True, postgresql_include=['user_id'])
+
+
+def downgrade() -> None:
+    # Сверенные счётчики остаются: они не меньше выданных номеров и подходят старой схеме
+    op.drop_index('ix_tickets_lottery_id_ticket_number', table_name='tickets')
+    op.create_index('ix_tickets_lottery_id_ticket_number', 'tickets', ['lottery_id', 'ticket_number'],
+                    unique=False, postgresql_include=['user_id'])
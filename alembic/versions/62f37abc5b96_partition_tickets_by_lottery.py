@@ -0,0 +1,89 @@
+"""Partition tickets by lottery
+
+Revision ID: 62f37abc5b96
+Revises: 1ae4a2636b46
+Create Date: 2026-10-18 19:12:40.551870
+
+Таблица tickets пересоздаётся как секционированная по lottery_id (PARTITION BY LIST):
+секция tickets_lottery_<id> для каждой существующей лотереи и tickets_default для остальных.
+Все билеты копируются, поэтому миграцию нужно выполнять при остановленном боте.
+Билеты без lottery_id не переносятся: ключ секционирования не может быть NULL.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '62f37abc5b96'
+down_revision: Union[str, None] = '1ae4a2636b46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = 'id, ticket_number, "create", lottery_id, user_id'
+
+
+def _create_constraints_and_indexes(primary_key: str) -> None:
+    op.execute(f"ALTER TABLE tickets ADD CONSTRAINT tickets_pkey PRIMARY KEY ({primary_key})")
+    op.execute("ALTER TABLE tickets ADD CONSTRAINT unique_ticket_per_lottery UNIQUE (user_id, lottery_id)")
+    op.create_index('ix_tickets_id', 'tickets', ['id'], unique=False)
+    op.create_index('ix_tickets_lottery_id_ticket_number', 'tickets', ['lottery_id', 'ticket_number'],
+                    unique=False, postgresql_include=['user_id'])
+    op.create_index('ix_tickets_lottery_id_user_id', 'tickets', ['lottery_id', 'user_id'], unique=False)
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE tickets_partitioned (
+            id BIGINT NOT NULL DEFAULT nextval('tickets_id_seq'),
+            ticket_number INTEGER NOT NULL,
+            "create" TIMESTAMP WITHOUT TIME ZONE,
+            lottery_id BIGINT NOT NULL CONSTRAINT tickets_lottery_id_fkey REFERENCES lotteries (id),
+            user_id BIGINT CONSTRAINT tickets_user_id_fkey REFERENCES users (id)
+        ) PARTITION BY LIST (lottery_id)
+        """
+    )
+    op.execute("CREATE TABLE tickets_default PARTITION OF tickets_partitioned DEFAULT")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            lottery RECORD;
+        BEGIN
+            FOR lottery IN SELECT id FROM lotteries LOOP
+                EXECUTE format(
+                    'CREATE TABLE tickets_lottery_%s PARTITION OF tickets_partitioned FOR VALUES IN (%s)',
+                    lottery.id, lottery.id
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute(f"INSERT INTO tickets_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM tickets WHERE lottery_id IS NOT NULL")
+    op.execute("ALTER SEQUENCE tickets_id_seq OWNED BY tickets_partitioned.id")
+    op.drop_table('tickets')
+    op.rename_table('tickets_partitioned', 'tickets')
+    _create_constraints_and_indexes("id, lottery_id")
+
+
+def downgrade() -> None:
+    # Отсоединённые (архивные) секции в таблицу не возвращаются
+    op.execute(
+        """
+        CREATE TABLE tickets_plain (
+            id BIGINT NOT NULL DEFAULT nextval('tickets_id_seq'),
+            ticket_number INTEGER NOT NULL,
+            "create" TIMESTAMP WITHOUT TIME ZONE,
+            lottery_id BIGINT CONSTRAINT tickets_lottery_id_fkey REFERENCES lotteries (id),
+            user_id BIGINT CONSTRAINT tickets_user_id_fkey REFERENCES users (id)
+        )
+        """
+    )
+    op.execute(f"INSERT INTO tickets_plain ({COLUMNS}) SELECT {COLUMNS} FROM tickets")
+    op.execute("ALTER SEQUENCE tickets_id_seq OWNED BY tickets_plain.id")
+    op.drop_table('tickets')  # Секции удаляются вместе с таблицей
+    op.rename_table('tickets_plain', 'tickets')
+    _create_constraints_and_indexes("id")
@@ -0,0 +1,42 @@
+"""Add ticket counters
+
+Revision ID: 8649fc74c294
+Revises: 6f676ab39b7a
+Create Date: 2026-10-18 10:12:31.418202
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8649fc74c294'
+down_revision: Union[str, None] = '6f676ab39b7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ticket_counters',
+        sa.Column('lottery_id', sa.BigInteger(), nullable=False),
+        sa.Column('last_number', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['lottery_id'], ['lotteries.id'], ),
+        sa.PrimaryKeyConstraint('lottery_id')
+    )
+    # Счётчик существующих лотерей начинается с последнего выданного номера,
+    # чтобы новые блоки не пересекались с уже выданными билетами
+    op.execute(
+        """
+        INSERT INTO ticket_counters (lottery_id, last_number)
+        SELECT lottery_id, MAX(ticket_number)
+        FROM tickets
+        GROUP BY lottery_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ticket_counters')
@@ -0,0 +1,51 @@
+"""Add broadcasts
+
+Revision ID: a3066152bd0f
+Revises: fb1859eb6ec3
+Create Date: 2026-10-18 15:21:47.902311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3066152bd0f'
+down_revision: Union[str, None] = 'fb1859eb6ec3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'broadcasts',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('lottery_id', sa.BigInteger(), nullable=True),
+        sa.Column('text', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('dry_run', sa.Boolean(), nullable=False),
+        sa.Column('last_user_id', sa.BigInteger(), nullable=False),
+        sa.Column('create', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['lottery_id'], ['lotteries.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_broadcasts_id'), 'broadcasts', ['id'], unique=False)
+    op.create_table(
+        'broadcast_deliveries',
+        sa.Column('broadcast_id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('create', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['broadcast_id'], ['broadcasts.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('broadcast_id', 'user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('broadcast_deliveries')
+    op.drop_index(op.f('ix_broadcasts_id'), table_name='broadcasts')
+    op.drop_table('broadcasts')
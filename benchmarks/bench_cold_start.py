@@ -0,0 +1,78 @@
+"""
+Холодный старт: время импорта, фазы запуска и первого запроса к БД с прогревом и без.
+
+Каждое измерение — отдельный процесс. Без прогрева первый запрос пользователя сам открывает
+соединение с БД (TCP, авторизация, загрузка типов asyncpg) и компилирует SQL; с прогревом
+это делает run_startup_checks до приёма обновлений. Bot API по умолчанию заменён FakeSession,
+с --real-bot getMe уходит в Telegram.
+
+Запуск: python -m benchmarks.bench_cold_start --runs 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+async def child(prewarm: bool, real_bot: bool) -> dict:
+    started = time.perf_counter()
+    import run_bot  # noqa: F401 — импорт всего бота, как при запуске
+    from init_bot import bot
+    from health.health import run_startup_checks
+    from models.database import engine
+    from utils.fake_session import FakeSession
+    from utils.utils_for_db import is_exists_user
+    imported = time.perf_counter()
+
+    if not real_bot:
+        bot.session = FakeSession()
+    if prewarm:
+        await run_startup_checks(bot)
+    startup_done = time.perf_counter()
+
+    # Отрицательный telegram_id не встречается в БД, данные не меняются
+    await is_exists_user(-1)
+    first = time.perf_counter()
+    await is_exists_user(-2)
+    second = time.perf_counter()
+    await engine.dispose()
+    return {
+        "import_s": imported - started,
+        "startup_s": startup_done - imported,
+        "first_query_ms": (first - startup_done) * 1000,
+        "second_query_ms": (second - first) * 1000,
+    }
+
+
+def measure(prewarm: bool, real_bot: bool, runs: int) -> dict:
+    results = []
+    for _ in range(runs):
+        command = [sys.executable, "-m", "benchmarks.bench_cold_start", "--child"]
+        command += ["--prewarm"] if prewarm else []
+        command += ["--real-bot"] if real_bot else []
+        output = subprocess.check_output(command, text=True)
+        # В выводе процесса есть и записи лога, результат — строка JSON
+        results.append(json.loads(next(line for line in output.splitlines() if line.startswith('{"import_s"'))))
+    return {key: statistics.median(result[key] for result in results) for key in results[0]}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--real-bot", action="store_true")
+    parser.add_argument("--prewarm", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.prewarm, args.real_bot))))
+        sys.exit()
+
+    print(f"{'режим':>12} | {'импорт, с':>9} | {'запуск, с':>9} | {'1-й запрос, мс':>14} | {'2-й запрос, мс':>14}")
+    for prewarm in (False, True):
+        median = measure(prewarm, args.real_bot, args.runs)
+        print(f"{'с прогревом' if prewarm else 'без прогрева':>12} | {median['import_s']:9.3f} | "
+              f"{median['startup_s']:9.3f} | {median['first_query_ms']:14.2f} | {median['second_query_ms']:14.2f}")
@@ -0,0 +1,65 @@
+"""
+Пиковое потребление памяти (RSS) при выгрузке в зависимости от количества строк.
+
+Каждое измерение выполняется в отдельном процессе, потому что ru_maxrss — максимум за всю
+жизнь процесса. По умолчанию строки генерируются без БД; с --lottery выгружается
+настоящая лотерея через iter_lottery_data (--rows тогда не используется).
+
+Запуск: python -m benchmarks.bench_export --format xlsx --rows 1000 10000 100000 500000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from export.export import WRITERS
+
+
+async def synthetic_chunks(rows: int, chunk_size: int = 1000):
+    for start in range(0, rows, chunk_size):
+        yield [
+            {
+                "ticket_number": 100 + number,
+                "telegram_id": 10 ** 9 + number,
+                "full_name": "Иванов Иван Иванович",
+                "full_name_from_tg": "Ivan Ivanov",
+                "lottery_name": "Лотерея"
+            }
+            for number in range(start, min(start + chunk_size, rows))
+        ]
+
+
+async def child(rows: int, file_format: str, lottery: str | None) -> None:
+    if lottery:
+        from utils.utils_for_db import iter_lottery_data
+        chunks = iter_lottery_data(lottery)
+    else:
+        chunks = synthetic_chunks(rows)
+    with tempfile.TemporaryDirectory() as directory:
+        count = await WRITERS[file_format](chunks, os.path.join(directory, f"export.{file_format}"))
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # В Linux — в килобайтах
+    print(f"{count} {peak_kb}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--format", choices=WRITERS, default="csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000, 500000])
+    parser.add_argument("--lottery")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        asyncio.run(child(args.child, args.format, args.lottery))
+        sys.exit()
+
+    print(f"{'строк':>10} | {'пиковый RSS, МБ':>15}")
+    for rows in ([0] if args.lottery else args.rows):
+        command = [sys.executable, "-m", "benchmarks.bench_export", "--child", str(rows), "--format", args.format]
+        if args.lottery:
+            command += ["--lottery", args.lottery]
+        count, peak_kb = subprocess.check_output(command, text=True).split()
+        print(f"{count:>10} | {int(peak_kb) / 1024:15.1f}")
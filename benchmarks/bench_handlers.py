@@ -0,0 +1,214 @@
+"""
+Нагрузочный тест обработчиков handlers/handlers.py на полном сценарии регистрации.
+
+Каждый симулированный пользователь проходит путь /start → проверка подписки → согласие →
+фамилия, имя, отчество → получение номера. Обновления идут через настоящий Dispatcher
+(middleware, FSM-хранилище, БД из настроек), а Bot API заменён FakeSession: get_chat_member
+отвечает «member», сообщения никуда не отправляются.
+
+Тест создаёт в БД отдельную лотерею и пользователей с telegram_id от BENCH_TELEGRAM_ID,
+а после прогона удаляет их (если не передан --keep). Результаты — пропускная способность
+и p50/p95/p99 по шагам — сохраняются в JSON, с --compare выводится разница с прошлым прогоном.
+
+Запуск: python -m benchmarks.bench_handlers --users 2000 --concurrency 500
+        python -m benchmarks.bench_handlers --compare benchmarks/results/handlers-1a2b3c4.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+BENCH_TELEGRAM_ID = 7 * 10 ** 12  # Заведомо больше настоящих идентификаторов Telegram
+
+STEPS = ["start", "check_user_state", "waiting_for_consent", "consent_yes",
+         "last_name", "first_name", "middle_name", "get_number_of_ticket"]
+
+_update_ids = itertools.count(1)
+
+
+def make_message(user: User, text: str, from_bot: bool = False) -> Message:
+    return Message(
+        message_id=next(_update_ids),
+        date=datetime.now(),
+        chat=Chat(id=user.id, type="private"),
+        from_user=User(id=42, is_bot=True, first_name="Bot") if from_bot else user,
+        text=text
+    )
+
+
+def make_updates(telegram_id: int, bot) -> list[tuple[str, Update]]:
+    """
+    Обновления одного пользователя в порядке сценария регистрации.
+    Они сразу привязываются к bot, иначе feed_update пересоздаёт каждое через model_dump
+    и это попадает в замер
+    """
+    user = User(id=telegram_id, is_bot=False, first_name="Иван", last_name="Иванов", username=f"bench{telegram_id}")
+
+    def callback(data: str) -> Update:
+        return Update(update_id=next(_update_ids), callback_query=CallbackQuery(
+            id=str(next(_update_ids)),
+            from_user=user,
+            chat_instance=str(telegram_id),
+            message=make_message(user, "кнопка", from_bot=True),
+            data=data
+        ))
+
+    def text(value: str) -> Update:
+        return Update(update_id=next(_update_ids), message=make_message(user, value))
+
+    updates = [
+        text("/start"),
+        callback("check_user_state"),
+        callback("waiting_for_consent"),
+        callback("yes"),
+        text("Иванов"),
+        text("Иван"),
+        text("Иванович"),
+        callback("get_number_of_ticket"),
+    ]
+    return [(step, Update.model_validate(update.model_dump(), context={"bot": bot}))
+            for step, update in zip(STEPS, updates)]
+
+
+def summarize(latencies: list[float]) -> dict:
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "count": len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+async def run(users: int, concurrency: int, lottery_name: str, latency: float, keep: bool) -> dict:
+    # Модули бота импортируются после настройки окружения в __main__
+    from sqlalchemy import delete, func, select, text
+
+    from init_bot import bot, dp
+    from handlers import handlers  # noqa: F401 — регистрирует обработчики в router
+    from models.database import AsyncSession, engine, get_sync_sessionmaker
+    from models.models import Lottery, Ticket, TicketCounter, User as UserModel, ticket_partition_name
+    from utils.fake_session import FakeSession
+    from utils.outbound import outbound
+    from utils.utils_for_db import create_lottery
+
+    session = FakeSession(latency=latency)
+    bot.session = session
+
+    with get_sync_sessionmaker()() as sync_session:
+        create_lottery(sync_session, lottery_name, description="Нагрузочный тест")
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def simulate(telegram_id: int) -> None:
+        async with semaphore:
+            for step, update in make_updates(telegram_id, bot):
+                started = time.perf_counter()
+                await dp.feed_update(bot, update)
+                latencies[step].append(time.perf_counter() - started)
+
+    telegram_ids = range(BENCH_TELEGRAM_ID, BENCH_TELEGRAM_ID + users)
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(simulate(telegram_id) for telegram_id in telegram_ids))
+        elapsed = time.perf_counter() - started
+
+        # Каждый пользователь должен дойти до конца сценария и получить билет
+        async with AsyncSession() as db:
+            issued = await db.scalar(
+                select(func.count()).select_from(Ticket).join(Ticket.lottery).where(Lottery.name == lottery_name)
+            )
+    finally:
+        await outbound.close()
+        await dp.storage.close()
+        if not keep:
+            async with AsyncSession() as db:
+                lottery_id = await db.scalar(select(Lottery.id).where(Lottery.name == lottery_name))
+                await db.execute(text(f"DROP TABLE IF EXISTS {ticket_partition_name(lottery_id)}"))
+                await db.execute(delete(TicketCounter).where(TicketCounter.lottery_id == lottery_id))
+                await db.execute(delete(Lottery).where(Lottery.id == lottery_id))
+                await db.execute(delete(UserModel).where(
+                    UserModel.telegram_id.between(BENCH_TELEGRAM_ID, BENCH_TELEGRAM_ID + users - 1)
+                ))
+                await db.commit()
+        await engine.dispose()
+
+    return {
+        "throughput": {
+            "users_per_second": users / elapsed,
+            "updates_per_second": users * len(STEPS) / elapsed,
+            "elapsed_seconds": elapsed,
+        },
+        "tickets_issued": issued,
+        "steps": {step: summarize(latencies[step]) for step in STEPS},
+        "bot_api_requests": dict(session.requests),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(result: dict, baseline: dict | None) -> None:
+    throughput = result["throughput"]
+    print(f"{throughput['users_per_second']:.1f} польз/с, {throughput['updates_per_second']:.1f} обн/с, "
+          f"билетов выдано: {result['tickets_issued']}")
+    print(f"{'шаг':>22} | {'p50, мс':>8} | {'p95, мс':>8} | {'p99, мс':>8}" + (" | p95 к базе" if baseline else ""))
+    for step, stats in result["steps"].items():
+        line = f"{step:>22} | {stats['p50_ms']:8.2f} | {stats['p95_ms']:8.2f} | {stats['p99_ms']:8.2f}"
+        if baseline and step in baseline["steps"]:
+            line += f" | {stats['p95_ms'] / baseline['steps'][step]['p95_ms'] - 1:+8.1%}"
+        print(line)
+    if baseline:
+        ratio = throughput["updates_per_second"] / baseline["throughput"]["updates_per_second"] - 1
+        print(f"Пропускная способность к {baseline['commit']}: {ratio:+.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="Имитация задержки Bot API, с")
+    parser.add_argument("--real-limits", action="store_true",
+                        help="Оставить лимиты OutboundScheduler из настроек (иначе измеряется только код бота)")
+    parser.add_argument("--output", help="Файл результатов, по умолчанию benchmarks/results/handlers-<commit>.json")
+    parser.add_argument("--compare", help="Файл результатов прошлого прогона для сравнения")
+    parser.add_argument("--keep", action="store_true", help="Не удалять созданные данные")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    lottery_name = f"bench-{commit}-{int(time.time())}"
+    # Настройки читаются при импорте модулей бота, поэтому окружение задаётся до него
+    os.environ["LOTTERY_NAME"] = lottery_name
+    os.environ["EMAIL_NOTIFY_REGISTRATIONS"] = "false"
+    if not args.real_limits:
+        os.environ["OUTBOUND_RATE"] = os.environ["OUTBOUND_CHAT_RATE"] = "1000000"
+        os.environ["OUTBOUND_CHAT_BURST"] = "1000000"
+
+    result = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "params": vars(args),
+        **asyncio.run(run(args.users, args.concurrency, lottery_name, args.latency, args.keep)),
+    }
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(result, baseline)
+
+    output = Path(args.output or f"benchmarks/results/handlers-{commit}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"Результаты сохранены в {output}")
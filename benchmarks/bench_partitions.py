@@ -0,0 +1,147 @@
+"""
+Задержка запросов к билетам текущей лотереи в зависимости от количества прошлых лотерей:
+секционированная таблица tickets против обычной.
+
+Для каждой раскладки создаётся своя схема (bench_partitioned, bench_plain), в которую
+постепенно добавляются прошлые лотереи по --tickets-per-lottery билетов. После каждого шага
+выполняется ANALYZE и измеряется медиана запросов текущей лотереи:
+    lookup — билет пользователя (get_number_ticket_current_lottery),
+    max    — последний номер (первый блок ticket_allocator),
+    count  — все билеты лотереи (выгрузка и розыгрыш читают их целиком).
+
+Запускать на локальном PostgreSQL, не на рабочей БД:
+    python -m benchmarks.bench_partitions --dsn postgresql+asyncpg://postgres@localhost/bench --history 0 20 100
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import settings
+from models.database import build_database_url
+from models.models import Base, Ticket, ticket_partition_name
+from utils.utils_for_db import _QUERY_TICKET_NUMBER
+
+LAYOUTS = {"partitioned": "bench_partitioned", "plain": "bench_plain"}
+
+# Та же таблица без секционирования, как до миграции 62f37abc5b96
+PLAIN_TICKETS = [
+    "DROP TABLE tickets",
+    """
+    CREATE TABLE tickets (
+        id BIGSERIAL PRIMARY KEY,
+        ticket_number INTEGER NOT NULL,
+        "create" TIMESTAMP WITHOUT TIME ZONE,
+        lottery_id BIGINT REFERENCES lotteries (id),
+        user_id BIGINT REFERENCES users (id),
+        CONSTRAINT unique_ticket_per_lottery UNIQUE (user_id, lottery_id)
+    )
+    """,
+    "CREATE INDEX ix_tickets_lottery_id_ticket_number ON tickets (lottery_id, ticket_number) INCLUDE (user_id)",
+    "CREATE INDEX ix_tickets_lottery_id_user_id ON tickets (lottery_id, user_id)",
+]
+
+_QUERY_MAX_NUMBER = select(func.max(Ticket.ticket_number))
+_QUERY_COUNT = select(func.count()).select_from(Ticket)
+
+
+async def add_lottery(connection, layout: str, lottery_id: int, tickets: int) -> None:
+    await connection.execute(text(
+        "INSERT INTO lotteries (id, name, description, \"create\") VALUES (:id, :name, '', now())"
+    ), {"id": lottery_id, "name": f"lottery-{lottery_id}"})
+    if layout == "partitioned":
+        await connection.execute(text(
+            f"CREATE TABLE {ticket_partition_name(lottery_id)} PARTITION OF tickets FOR VALUES IN ({lottery_id})"
+        ))
+    await connection.execute(text(
+        "INSERT INTO tickets (ticket_number, \"create\", lottery_id, user_id) "
+        "SELECT 99 + n, now(), :lottery_id, n FROM generate_series(1, :tickets) AS n"
+    ), {"lottery_id": lottery_id, "tickets": tickets})
+
+
+async def timed(connection, statement, params: dict, repeats: int) -> float:
+    """Медиана времени выполнения в миллисекундах"""
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await connection.execute(statement, params)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+
+async def measure(connection, current_id: int, users: int, repeats: int) -> dict:
+    lookup = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await connection.execute(_QUERY_TICKET_NUMBER, {"lottery_id": current_id, "user_id": random.randint(1, users)})
+        lookup.append(time.perf_counter() - started)
+    return {
+        "lookup": statistics.median(lookup) * 1000,
+        "max": await timed(connection, _QUERY_MAX_NUMBER.where(Ticket.lottery_id == current_id), {}, repeats),
+        "count": await timed(connection, _QUERY_COUNT.where(Ticket.lottery_id == current_id), {}, max(repeats // 20, 3)),
+    }
+
+
+async def run_layout(dsn, layout: str, history: list[int], tickets: int, repeats: int, keep: bool) -> dict:
+    schema = LAYOUTS[layout]
+    engine = create_async_engine(dsn, connect_args={"server_settings": {"search_path": schema}})
+    results = {}
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            await connection.execute(text(f"CREATE SCHEMA {schema}"))
+            await connection.run_sync(Base.metadata.create_all)
+            if layout == "plain":
+                for statement in PLAIN_TICKETS:
+                    await connection.execute(text(statement))
+            await connection.execute(text(
+                "INSERT INTO users (id, telegram_id, full_name, full_name_from_tg, username, is_active) "
+                "SELECT n, 1000000000 + n, '', '', '', true FROM generate_series(1, :tickets) AS n"
+            ), {"tickets": tickets})
+
+        # Текущая лотерея создаётся первой и получает большой id, прошлые добавляются перед ней
+        current_id = 10 ** 6
+        async with engine.begin() as connection:
+            await add_lottery(connection, layout, current_id, tickets)
+
+        added = 0
+        for past in history:
+            async with engine.begin() as connection:
+                while added < past:
+                    added += 1
+                    await add_lottery(connection, layout, added, tickets)
+            async with engine.connect() as connection:
+                await connection.execute(text("ANALYZE tickets"))
+                await measure(connection, current_id, tickets, 10)  # прогрев кэша и соединения
+                results[past] = await measure(connection, current_id, tickets, repeats)
+            print(f"{layout:>11} | {past:>8} | " + " | ".join(f"{value:8.3f}" for value in results[past].values()))
+    finally:
+        if not keep:
+            async with engine.begin() as connection:
+                await connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await engine.dispose()
+    return results
+
+
+async def main(dsn, history: list[int], tickets: int, repeats: int, keep: bool) -> None:
+    print(f"{'раскладка':>11} | {'прошлых':>8} | {'lookup':>8} | {'max':>8} | {'count':>8}   (медиана, мс)")
+    for layout in LAYOUTS:
+        await run_layout(dsn, layout, history, tickets, repeats, keep)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=None, help="По умолчанию — БД из настроек")
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 10, 50, 100],
+                        help="Количество прошлых лотерей на каждом шаге (по возрастанию)")
+    parser.add_argument("--tickets-per-lottery", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="Не удалять схемы после прогона")
+    args = parser.parse_args()
+
+    dsn = args.dsn or build_database_url(settings)
+    asyncio.run(main(dsn, sorted(args.history), args.tickets_per_lottery, args.repeats, args.keep))
@@ -0,0 +1,81 @@
+"""
+Сравнение двух режимов работы с БД при обработке обновления:
+отдельная сессия в каждой функции utils_for_db и одна сессия на обновление (DbSessionMiddleware).
+
+Каждое «обновление» повторяет запросы шага ввода отчества и получения номера:
+is_exists_user, get_user_by_telegram_id и check_user_ticket для несуществующего пользователя,
+поэтому данные в БД не меняются.
+
+Запуск: python -m benchmarks.bench_session_modes --updates 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import event
+
+from config import settings
+from models.database import AsyncSession, engine
+from utils.utils_for_db import is_exists_user, get_user_by_telegram_id, check_user_ticket
+
+
+checkouts = 0
+
+
+@event.listens_for(engine.sync_engine.pool, "checkout")
+def _count_checkout(*args):
+    global checkouts
+    checkouts += 1
+
+
+async def handle_update(telegram_id: int, shared: bool) -> float:
+    started = time.perf_counter()
+    if shared:
+        async with AsyncSession() as session:
+            await is_exists_user(telegram_id, session=session)
+            await get_user_by_telegram_id(telegram_id, session=session)
+            await check_user_ticket(telegram_id, settings.LOTTERY_NAME, session=session)
+    else:
+        await is_exists_user(telegram_id)
+        await get_user_by_telegram_id(telegram_id)
+        await check_user_ticket(telegram_id, settings.LOTTERY_NAME)
+    return time.perf_counter() - started
+
+
+async def run_mode(shared: bool, updates: int, concurrency: int) -> None:
+    global checkouts
+    checkouts = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(telegram_id: int) -> float:
+        async with semaphore:
+            return await handle_update(telegram_id, shared)
+
+    # Отрицательные telegram_id гарантированно не встречаются в БД
+    telegram_ids = [-random.randint(1, 10 ** 12) for _ in range(updates)]
+    started = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(limited(telegram_id) for telegram_id in telegram_ids)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    mode = "сессия на обновление" if shared else "сессия на запрос"
+    print(f"{mode:>22}: {updates / elapsed:8.1f} обн/с | "
+          f"p50 {quantiles[49] * 1000:6.2f} мс | p99 {quantiles[98] * 1000:6.2f} мс | "
+          f"checkout из пула: {checkouts}")
+
+
+async def main(updates: int, concurrency: int) -> None:
+    await run_mode(shared=False, updates=concurrency, concurrency=concurrency)  # прогрев пула
+    await run_mode(shared=False, updates=updates, concurrency=concurrency)
+    await run_mode(shared=True, updates=updates, concurrency=concurrency)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.updates, args.concurrency))
@@ -0,0 +1,80 @@
+"""
+Сравнение пропускной способности одного и N процессов-воркеров.
+
+Главный процесс раздаёт синтетические обновления через WorkerPool так же, как run_workers,
+а воркеры прогоняют их через собственный Dispatcher с обработчиком, который нагружает CPU
+(разбор обновления, хеширование). Telegram и БД не используются.
+
+Запуск: python -m benchmarks.bench_workers --updates 20000 --workers 4
+"""
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import time
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Chat, Message, Update, User
+
+from workers.workers import WorkerPool, get_worker_index
+
+
+def bench_worker(index: int, queue: multiprocessing.Queue, ready: multiprocessing.Queue) -> None:
+    asyncio.run(_bench_worker(index, queue, ready))
+
+
+async def _bench_worker(index: int, queue: multiprocessing.Queue, ready: multiprocessing.Queue) -> None:
+    bot = Bot(token="42:BENCHMARK")
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handler(message: Message) -> None:
+        hashlib.pbkdf2_hmac("sha256", message.text.encode(), b"salt", 2000)
+
+    ready.put(index)
+    loop = asyncio.get_running_loop()
+    while (raw := await loop.run_in_executor(None, queue.get)) is not None:
+        await dp.feed_update(bot, Update.model_validate_json(raw, context={"bot": bot}))
+    ready.put(index)
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    user = User(id=user_id, is_bot=False, first_name="Тест")
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=user,
+        text="Иванов"
+    )
+    return Update(update_id=update_id, message=message)
+
+
+def run(workers: int, updates: int) -> float:
+    pool = WorkerPool(workers, target=bench_worker)
+    pool.start()
+    payload = [make_update(update_id, 1000 + update_id % 5000) for update_id in range(updates)]
+
+    started = time.perf_counter()
+    for update in payload:
+        pool.submit(get_worker_index(update, workers), update.model_dump_json(exclude_unset=True))
+    for queue in pool._queues:
+        queue.put(None)
+    for _ in range(workers):
+        pool._ready.get()  # Воркер сообщает, что обработал свою очередь
+    elapsed = time.perf_counter() - started
+    pool.stop()
+    return updates / elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    single = run(1, args.updates)
+    print(f"1 воркер: {single:8.1f} обн/с")
+    multi = run(args.workers, args.updates)
+    print(f"{args.workers} воркеров: {multi:8.1f} обн/с (x{multi / single:.2f})")
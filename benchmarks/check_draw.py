@@ -0,0 +1,196 @@
+"""
+Проверка розыгрыша draw.draw: воспроизводимость и равномерность.
+
+PostgreSQL не нужна: запросы draw.draw выполняются как есть в SQLite в памяти, поэтому
+условия на лотерею и User.is_active работают по-настоящему. В каждой лотерее есть билеты
+неактивных пользователей, а билеты другой лотереи занимают те же номера — они не должны
+выигрывать.
+
+1. Воспроизводимость: тот же seed — те же числа DeterministicRandom и те же победители
+   обоими способами и в draw_winners; другой seed — другой результат.
+2. Равномерность (критерий хи-квадрат, уровень значимости --alpha): randbelow по корзинам,
+   частота выигрыша каждого билета и частота первого места в --draws розыгрышах с разными
+   seed для обоих способов.
+
+Код выхода 1, если хотя бы одна проверка не прошла.
+Запуск: python -m benchmarks.check_draw --draws 2000
+"""
+import argparse
+import asyncio
+import math
+import statistics
+import sys
+from collections import Counter
+
+from sqlalchemy import create_engine, text
+
+from draw import draw
+
+# Номера с пропусками: плотность выше MIN_DENSITY, розыгрыш идёт по индексу
+DENSE_TICKETS = [number for number in range(100, 125) if number % 5 != 3]
+# Редкие номера: плотность ниже MIN_DENSITY, розыгрыш идёт reservoir sampling
+SPARSE_TICKETS = [100 + number * 7 for number in range(20)]
+LOTTERIES = {"dense": (1, DENSE_TICKETS, 104), "sparse": (2, SPARSE_TICKETS, 101)}  # id, билеты, билет неактивного
+OTHER_LOTTERY_ID = 3  # Лотерея с теми же номерами билетов
+
+
+class _AsyncRows:
+    def __init__(self, result):
+        self._result = result
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self._result:
+            yield row
+
+
+class SqliteSession:
+    """Асинхронная обёртка над синхронным соединением SQLite вместо AsyncSession в draw.draw"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, query):
+        return self.connection.execute(query)
+
+    async def stream(self, query):
+        return _AsyncRows(self.connection.execute(query))
+
+
+def create_tickets():
+    """
+    Создаёт в SQLite колонки, которые читает draw.draw, и билеты лотерей
+    :return: (соединение, {лотерея: {номер билета активного пользователя: telegram_id}}):
+    """
+    connection = create_engine("sqlite://").connect()
+    connection.execute(text("CREATE TABLE lotteries (id INTEGER PRIMARY KEY, name TEXT)"))
+    connection.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, telegram_id BIGINT, is_active BOOLEAN)"))
+    connection.execute(text(
+        "CREATE TABLE tickets (id INTEGER PRIMARY KEY, ticket_number INTEGER, lottery_id INTEGER, user_id INTEGER)"
+    ))
+    connection.execute(text("INSERT INTO lotteries VALUES (:id, :name)"), [
+        {"id": lottery_id, "name": name} for name, (lottery_id, _, _) in LOTTERIES.items()
+    ] + [{"id": OTHER_LOTTERY_ID, "name": "other"}])
+
+    tickets = [(lottery_id, number, True) for lottery_id, numbers, _ in LOTTERIES.values() for number in numbers]
+    tickets += [(lottery_id, inactive, False) for lottery_id, _, inactive in LOTTERIES.values()]
+    tickets += [(OTHER_LOTTERY_ID, number, True) for number in range(100, 300)]
+    for user_id, (lottery_id, number, is_active) in enumerate(tickets, start=1):
+        connection.execute(text("INSERT INTO users VALUES (:id, :telegram_id, :is_active)"),
+                           {"id": user_id, "telegram_id": 1000 + user_id, "is_active": is_active})
+        connection.execute(text(
+            "INSERT INTO tickets (ticket_number, lottery_id, user_id) VALUES (:number, :lottery, :user)"
+        ), {"number": number, "lottery": lottery_id, "user": user_id})
+
+    eligible = {
+        name: {number: 1000 + user_id for user_id, (ticket_lottery, number, is_active) in enumerate(tickets, start=1)
+               if ticket_lottery == lottery_id and is_active}
+        for name, (lottery_id, _, _) in LOTTERIES.items()
+    }
+    return connection, eligible
+
+
+def chi_square(observed: list[int], expected: float) -> float:
+    return sum((count - expected) ** 2 / expected for count in observed)
+
+
+def chi_square_critical(df: int, alpha: float) -> float:
+    """Критическое значение хи-квадрат по приближению Уилсона — Хилферти"""
+    z = statistics.NormalDist().inv_cdf(1 - alpha)
+    return df * (1 - 2 / (9 * df) + z * math.sqrt(2 / (9 * df))) ** 3
+
+
+def seed_for(index: int) -> bytes:
+    return index.to_bytes(32, "big")
+
+
+async def run_draw(lottery_name: str, tickets: dict[int, int], winners: int, seed: bytes) -> list[dict]:
+    rng = draw.DeterministicRandom(seed, context="check")
+    if lottery_name == "dense":
+        low, high = min(tickets), max(tickets)
+        return await draw._draw_by_index(rng, lottery_name, winners, low, high, len(tickets) / (high - low + 1))
+    return await draw._draw_by_reservoir(rng, lottery_name, winners)
+
+
+async def check_reproducibility(eligible: dict[str, dict[int, int]]) -> list[tuple[str, bool]]:
+    checks = []
+    first = draw.DeterministicRandom(seed_for(1), context="check")
+    second = draw.DeterministicRandom(seed_for(1), context="check")
+    other = draw.DeterministicRandom(seed_for(2), context="check")
+    sequence = [first.randbelow(1000) for _ in range(100)]
+    checks.append(("DeterministicRandom: тот же seed — та же последовательность",
+                   sequence == [second.randbelow(1000) for _ in range(100)]))
+    checks.append(("DeterministicRandom: другой seed — другая последовательность",
+                   sequence != [other.randbelow(1000) for _ in range(100)]))
+
+    for lottery_name, tickets in eligible.items():
+        same = [await run_draw(lottery_name, tickets, 3, seed_for(7)) for _ in range(2)]
+        different = await run_draw(lottery_name, tickets, 3, seed_for(8))
+        checks.append((f"{lottery_name}: тот же seed — те же победители", same[0] == same[1]))
+        checks.append((f"{lottery_name}: другой seed — другие победители", same[0] != different))
+
+    for lottery_name, method in (("dense", "index"), ("sparse", "reservoir")):
+        results = [await draw.draw_winners(lottery_name, 3, seed_for(9), draw.make_commitment(seed_for(9)))
+                   for _ in range(2)]
+        checks.append((f"draw_winners ({method}): результат воспроизводится",
+                       results[0] == results[1] and results[0].method == method
+                       and results[0].eligible == len(eligible[lottery_name])))
+    return checks
+
+
+async def check_uniformity(eligible: dict[str, dict[int, int]], draws: int, alpha: float) -> list[tuple[str, bool]]:
+    checks = []
+
+    rng = draw.DeterministicRandom(seed_for(0), context="uniformity")
+    buckets = 10
+    counts = Counter(rng.randbelow(buckets) for _ in range(draws * 50))
+    statistic = chi_square([counts[bucket] for bucket in range(buckets)], draws * 50 / buckets)
+    critical = chi_square_critical(buckets - 1, alpha)
+    checks.append((f"randbelow({buckets}): хи-квадрат {statistic:.1f} < {critical:.1f}", statistic < critical))
+
+    for lottery_name, winners in (("dense", 3), ("sparse", 10)):
+        tickets = eligible[lottery_name]
+        wins, first_places, strangers = Counter(), Counter(), 0
+        for index in range(draws):
+            result = await run_draw(lottery_name, tickets, winners, seed_for(index))
+            first_places[result[0]["ticket_number"]] += 1
+            for winner in result:
+                wins[winner["ticket_number"]] += 1
+                strangers += tickets.get(winner["ticket_number"]) != winner["telegram_id"]
+        checks.append((f"{lottery_name}: неактивные и чужие билеты не выигрывают", strangers == 0))
+
+        critical = chi_square_critical(len(tickets) - 1, alpha)
+        statistic = chi_square([wins[number] for number in tickets], draws * winners / len(tickets))
+        checks.append((f"{lottery_name}: выигрыши, хи-квадрат {statistic:.1f} < {critical:.1f}", statistic < critical))
+        statistic = chi_square([first_places[number] for number in tickets], draws / len(tickets))
+        checks.append((f"{lottery_name}: первое место, хи-квадрат {statistic:.1f} < {critical:.1f}",
+                       statistic < critical))
+    return checks
+
+
+async def main(draws: int, alpha: float) -> int:
+    connection, eligible = create_tickets()
+    draw.AsyncSession = SqliteSession(connection)
+    checks = await check_reproducibility(eligible) + await check_uniformity(eligible, draws, alpha)
+    for name, ok in checks:
+        print(f"{'ok' if ok else 'FAIL':>4} | {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--draws", type=int, default=2000, help="Розыгрышей с разными seed для проверки равномерности")
+    parser.add_argument("--alpha", type=float, default=0.001, help="Уровень значимости критерия хи-квадрат")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.draws, args.alpha)))
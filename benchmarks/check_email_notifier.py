@@ -0,0 +1,119 @@
+"""
+Проверка EmailNotifier на локальном SMTP-сервере aiosmtpd (pip install aiosmtpd).
+
+1. Одна регистрация — одно письмо, пользовательские поля экранированы в HTML.
+2. При batch_size > 1 регистрации объединяются в дайджест.
+3. Авторизация выполняется один раз на соединение, а после разрыва соединения
+   сервером письмо всё равно доставляется через новое.
+
+Код выхода 1, если хотя бы одна проверка не прошла.
+Запуск: python -m benchmarks.check_email_notifier
+"""
+import argparse
+import asyncio
+import sys
+from email import message_from_bytes
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from utils.notifications import EmailNotifier
+
+USERNAME, PASSWORD = "bot@example.com", "secret"
+
+
+class Mailbox:
+    """Обработчик aiosmtpd: складывает принятые письма в список"""
+
+    def __init__(self):
+        self.messages = []
+        self.logins = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(message_from_bytes(envelope.content))
+        return "250 OK"
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        if auth_data.login.decode() == USERNAME and auth_data.password.decode() == PASSWORD:
+            self.logins += 1
+            return AuthResult(success=True)
+        return AuthResult(success=False, handled=False)
+
+
+def html_body(message) -> str:
+    return message.get_payload(decode=True).decode(message.get_content_charset() or "utf-8")
+
+
+async def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def main(port: int) -> int:
+    mailbox = Mailbox()
+
+    def start_server() -> Controller:
+        server = Controller(
+            mailbox, hostname="127.0.0.1", port=port,
+            authenticator=mailbox.authenticate, auth_require_tls=False
+        )
+        server.start()
+        return server
+
+    controller = start_server()
+
+    def make_notifier(batch_size: int) -> EmailNotifier:
+        return EmailNotifier(
+            hostname="127.0.0.1", port=port, username=USERNAME, password=PASSWORD,
+            recipients="admin@example.com", batch_size=batch_size, batch_interval=0.2,
+            queue_size=100, start_tls=False
+        )
+
+    checks = []
+    try:
+        notifier = make_notifier(batch_size=1)
+        notifier.notify_registration(1, "Иванов Иван Иванович", "<b>Ivan</b> & co", "<script>")
+        delivered = await wait_for(lambda: len(mailbox.messages) == 1)
+        body = html_body(mailbox.messages[0]) if delivered else ""
+        checks.append(("одно письмо на регистрацию", delivered))
+        checks.append(("поля из Telegram экранированы",
+                       "&lt;b&gt;Ivan&lt;/b&gt; &amp; co" in body and "&lt;script&gt;" in body
+                       and "<script>" not in body))
+
+        notifier.notify_registration(2, "Петров Пётр Петрович", "Petr", "petr")
+        await wait_for(lambda: len(mailbox.messages) == 2)
+        checks.append(("соединение и авторизация переиспользуются", mailbox.logins == 1))
+
+        # Сервер закрывает простаивающее соединение
+        controller.stop()
+        controller = start_server()
+        notifier.notify_registration(3, "Сидоров Сидор Сидорович", "Sidor", "sidor")
+        checks.append(("письмо доставлено после разрыва соединения",
+                       await wait_for(lambda: len(mailbox.messages) == 3)))
+        await notifier.close()
+
+        digest = make_notifier(batch_size=3)
+        for telegram_id in range(10, 13):
+            digest.notify_registration(telegram_id, "Иванов Иван Иванович", "Ivan", f"user{telegram_id}")
+        delivered = await wait_for(lambda: len(mailbox.messages) == 4)
+        await digest.close()
+        checks.append(("три регистрации — один дайджест",
+                       delivered and len(mailbox.messages) == 4
+                       and all(f"user{i}" in html_body(mailbox.messages[3]) for i in range(10, 13))))
+    finally:
+        controller.stop()
+
+    for name, ok in checks:
+        print(f"{'ok' if ok else 'FAIL':>4} | {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.port)))
@@ -0,0 +1,165 @@
+"""
+Проверка планов запросов utils_for_db: ни один запрос не должен читать большие таблицы
+последовательным сканированием (Seq Scan).
+
+Скрипт создаёт в указанной БД отдельную схему, строит таблицы и индексы по моделям,
+заполняет их данными реалистичного объёма, выполняет ANALYZE и EXPLAIN для каждого запроса.
+Таблицы меньше --min-rows строк (например, lotteries) не проверяются: их планировщик
+правильно читает целиком. Код выхода 1, если хотя бы один план содержит недопустимый Seq Scan.
+После проверки схема удаляется (если не передан --keep).
+
+Запускать на локальном PostgreSQL, не на рабочей БД:
+    python -m benchmarks.check_query_plans --dsn postgresql+asyncpg://postgres@localhost/plan_check
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import settings
+from models.database import build_database_url
+from models.models import Base, ticket_partition_name
+from utils.utils_for_db import (
+    _QUERY_GET_OR_CREATE_TICKET,
+    _QUERY_IS_EXISTS_USER,
+    _QUERY_LOTTERY_BY_NAME,
+    _QUERY_LOTTERY_DATA,
+    _QUERY_LOTTERY_STATS,
+    _QUERY_LOTTERY_TICKETS,
+    _QUERY_TICKET_NUMBER,
+    _QUERY_TICKET_NUMBER_BY_TELEGRAM_ID,
+    _QUERY_USER_BY_TELEGRAM_ID,
+    _QUERY_USER_TICKET_NUMBER
+)
+
+SCHEMA = "plan_check"
+
+
+def build_checks(users: int, lotteries: int):
+    """
+    Запросы для проверки: (название, запрос, параметры, таблицы, которым Seq Scan разрешён)
+    """
+    telegram_id = 10 ** 9 + users // 2
+    lottery_name = f"lottery-{lotteries // 2}"
+    return [
+        ("is_exists_user", _QUERY_IS_EXISTS_USER, {"telegram_id": telegram_id}, set()),
+        ("get_user_by_telegram_id", _QUERY_USER_BY_TELEGRAM_ID, {"telegram_id": telegram_id}, set()),
+        ("get_lottery_by_name", _QUERY_LOTTERY_BY_NAME, {"lottery_name": lottery_name}, set()),
+        ("check_user_ticket", _QUERY_USER_TICKET_NUMBER,
+         {"lottery_name": lottery_name, "telegram_id": telegram_id}, set()),
+        ("get_number_ticket_current_lottery", _QUERY_TICKET_NUMBER,
+         {"lottery_id": lotteries // 2, "user_id": users // 2}, set()),
+        ("get_or_create_ticket", _QUERY_GET_OR_CREATE_TICKET,
+         {"telegram_id": telegram_id, "lottery_id": lotteries // 2, "ticket_number": 10 ** 8,
+          "create": datetime.utcnow()}, set()),
+        ("get_or_create_ticket (повторное чтение)", _QUERY_TICKET_NUMBER_BY_TELEGRAM_ID,
+         {"telegram_id": telegram_id, "lottery_id": lotteries // 2}, set()),
+        # Выгрузка читает всех участников лотереи: соединение с users хешем допустимо,
+        # но билеты должны выбираться по индексу лотереи
+        ("iter_lottery_data", _QUERY_LOTTERY_DATA, {"lottery_name": lottery_name}, {"users"}),
+        ("warm_participants_index", _QUERY_LOTTERY_TICKETS, {"lottery_name": lottery_name}, {"users"}),
+        # Количество пользователей сверка читает целиком, билеты — только из секции лотереи
+        ("reconcile_lottery_stats", _QUERY_LOTTERY_STATS, {"lottery_name": lottery_name}, {"users"}),
+    ]
+
+
+async def fill(connection, users: int, lotteries: int, tickets_per_user: int) -> None:
+    await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    await connection.run_sync(Base.metadata.create_all)
+
+    await connection.execute(text(
+        "INSERT INTO lotteries (id, name, description, \"create\") "
+        "SELECT n, 'lottery-' || n, '', now() FROM generate_series(1, :lotteries) AS n"
+    ), {"lotteries": lotteries})
+    for lottery_id in range(1, lotteries + 1):
+        await connection.execute(text(
+            f"CREATE TABLE {ticket_partition_name(lottery_id)} PARTITION OF tickets FOR VALUES IN ({lottery_id})"
+        ))
+    await connection.execute(text(
+        "INSERT INTO users (id, telegram_id, full_name, full_name_from_tg, username, is_active) "
+        "SELECT n, 1000000000 + n, 'Иванов Иван Иванович', 'Ivan Ivanov', 'user' || n, n % 20 <> 0 "
+        "FROM generate_series(1, :users) AS n"
+    ), {"users": users})
+    # Каждый пользователь участвует в tickets_per_user лотереях; повторяющиеся пары
+    # (если шаг 13 не взаимно прост с количеством лотерей) отсекает DISTINCT ON
+    await connection.execute(text(
+        "INSERT INTO tickets (ticket_number, \"create\", lottery_id, user_id) "
+        "SELECT DISTINCT ON (user_id, lottery_id) 99 + user_id, now(), lottery_id, user_id FROM ("
+        "  SELECT u AS user_id, (u * 7 + g * 13) % :lotteries + 1 AS lottery_id"
+        "  FROM generate_series(1, :users) AS u, generate_series(1, :tickets_per_user) AS g"
+        ") AS pairs"
+    ), {"users": users, "lotteries": lotteries, "tickets_per_user": tickets_per_user})
+    await connection.execute(text(
+        "INSERT INTO ticket_counters (lottery_id, last_number) "
+        "SELECT lottery_id, max(ticket_number) FROM tickets GROUP BY lottery_id"
+    ))
+
+
+def seq_scans(plan: dict) -> list[str]:
+    """
+    Таблицы, которые план читает последовательным сканированием
+    """
+    found = [plan["Relation Name"]] if plan["Node Type"] == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def explain(connection, query, params: dict) -> dict:
+    compiled = query.compile(dialect=connection.dialect)
+    values = compiled.construct_params(params)
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}",
+        tuple(values[name] for name in compiled.positiontup)
+    )
+    plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+async def main(dsn, users: int, lotteries: int, tickets_per_user: int, min_rows: int, keep: bool) -> int:
+    engine = create_async_engine(dsn, connect_args={"server_settings": {"search_path": SCHEMA}})
+    failed = 0
+    try:
+        async with engine.begin() as connection:
+            await fill(connection, users, lotteries, tickets_per_user)
+        async with engine.connect() as connection:
+            for table in Base.metadata.sorted_tables:
+                await connection.execute(text(f"ANALYZE {table.name}"))
+            result = await connection.execute(text(
+                "SELECT relname FROM pg_class WHERE relnamespace = CAST(:schema AS regnamespace) "
+                "AND relkind = 'r' AND reltuples < :min_rows"
+            ), {"schema": SCHEMA, "min_rows": min_rows})
+            small_tables = set(result.scalars())
+
+            for name, query, params, allowed in build_checks(users, lotteries):
+                plan = await explain(connection, query, params)
+                bad = [table for table in seq_scans(plan) if table not in allowed | small_tables]
+                status = "FAIL" if bad else "ok"
+                failed += bool(bad)
+                print(f"{status:>4} | {name:<35} | {plan['Node Type']}, cost {plan['Total Cost']}"
+                      + (f", Seq Scan: {', '.join(bad)}" if bad else ""))
+    finally:
+        if not keep:
+            async with engine.begin() as connection:
+                await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=None, help="По умолчанию — БД из настроек")
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--lotteries", type=int, default=50)
+    parser.add_argument("--tickets-per-user", type=int, default=3)
+    parser.add_argument("--min-rows", type=int, default=10000, help="Меньшие таблицы не проверяются")
+    parser.add_argument("--keep", action="store_true", help="Не удалять схему после проверки")
+    args = parser.parse_args()
+
+    dsn = args.dsn or build_database_url(settings)
+    sys.exit(asyncio.run(main(dsn, args.users, args.lotteries, args.tickets_per_user, args.min_rows, args.keep)))
@@ -0,0 +1,75 @@
+"""
+Проверка маршрутизации чтения между основной БД и репликой (get_read_session).
+
+Вместо настоящей реплики нужна вторая независимая база — на том же сервере
+(DB_REPLICA_DATABASE_PSQL) или на втором экземпляре PostgreSQL (DB_REPLICA_HOST_PSQL,
+DB_REPLICA_PORT_PSQL): скрипт пишет в неё строку, которой нет в основной БД, поэтому по
+ответу видно, откуда прочитаны данные. Физическая реплика (hot standby) не подойдёт — она
+только для чтения.
+
+1. Пользователь есть только в «реплике» — get_user_by_telegram_id должен его найти.
+2. Пользователь сохранён save_user в основную БД — сразу после записи он должен читаться
+   из основной БД, а после READ_YOUR_WRITES_WINDOW секунд — из «реплики», где его нет.
+
+Запуск: DB_REPLICA_DATABASE_PSQL=bot_replica python -m benchmarks.check_replica_routing
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+CHECK_TELEGRAM_ID = 8 * 10 ** 12  # Заведомо больше настоящих идентификаторов Telegram
+
+
+async def main(window: float) -> int:
+    # Модули бота импортируются после настройки окружения в __main__
+    from sqlalchemy import delete, insert
+
+    from models.database import engine, replica_engine
+    from models.models import User
+    from utils.utils_for_db import get_user_by_telegram_id, save_user
+
+    if replica_engine is None:
+        print("Реплика не настроена: задайте DB_REPLICA_DATABASE_PSQL или DB_REPLICA_HOST_PSQL")
+        return 1
+
+    replica_only, written = CHECK_TELEGRAM_ID, CHECK_TELEGRAM_ID + 1
+    for engine_ in (engine, replica_engine):
+        async with engine_.begin() as connection:
+            await connection.run_sync(User.__table__.create, checkfirst=True)
+            await connection.execute(delete(User).where(User.telegram_id.in_([replica_only, written])))
+    async with replica_engine.begin() as connection:
+        await connection.execute(insert(User).values(telegram_id=replica_only, full_name="Только в реплике"))
+
+    checks = []
+    try:
+        user = await get_user_by_telegram_id(replica_only)
+        checks.append(("чтение без записи идёт в реплику", user is not None))
+
+        await save_user(written, "Записан в основную БД", "", "")
+        user = await get_user_by_telegram_id(written)
+        checks.append(("сразу после записи чтение идёт в основную БД", user is not None))
+
+        await asyncio.sleep(window + 0.1)
+        user = await get_user_by_telegram_id(written)
+        checks.append((f"через {window} с чтение снова идёт в реплику", user is None))
+    finally:
+        for engine_ in (engine, replica_engine):
+            async with engine_.begin() as connection:
+                await connection.execute(delete(User).where(User.telegram_id.in_([replica_only, written])))
+            await engine_.dispose()
+
+    for name, ok in checks:
+        print(f"{'ok' if ok else 'FAIL':>4} | {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window", type=float, default=1, help="READ_YOUR_WRITES_WINDOW на время проверки, с")
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте модулей бота, поэтому окружение задаётся до него
+    os.environ["READ_YOUR_WRITES_WINDOW"] = str(args.window)
+    os.environ["USER_WRITE_BUFFER"] = "false"
+    sys.exit(asyncio.run(main(args.window)))
@@ -0,0 +1,151 @@
+"""
+Нагрузочная проверка уникальности номеров билетов при выдаче из нескольких процессов.
+
+Скрипт создаёт в БД из настроек отдельную лотерею и --users пользователей с telegram_id от
+CHECK_TELEGRAM_ID, затем --processes процессов одновременно выдают билеты через
+get_or_create_ticket. У каждого процесса свой ticket_allocator с маленьким блоком
+(--block-size), поэтому блоки резервируются в ticket_counters постоянно и наперегонки,
+а каждый пользователь запрашивает билет --taps раз одновременно (повторные нажатия).
+
+Проверяется, что у каждого пользователя ровно один билет и что номера в лотерее не повторяются.
+Код выхода 1, если нет. После проверки данные удаляются (если не передан --keep).
+
+Запускать на локальном PostgreSQL, не на рабочей БД:
+    python -m benchmarks.check_ticket_uniqueness --users 5000 --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+CHECK_TELEGRAM_ID = 9 * 10 ** 12  # Заведомо больше настоящих идентификаторов Telegram
+
+
+def issue_tickets(lottery_name: str, telegram_ids: list[int], taps: int, concurrency: int) -> None:
+    """Точка входа процесса: выдаёт билеты своей части пользователей"""
+    asyncio.run(_issue_tickets(lottery_name, telegram_ids, taps, concurrency))
+
+
+async def _issue_tickets(lottery_name: str, telegram_ids: list[int], taps: int, concurrency: int) -> None:
+    from models.database import engine
+    from utils.utils_for_db import get_lottery_by_name, get_or_create_ticket
+
+    lottery = await get_lottery_by_name(lottery_name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def tap(telegram_id: int) -> None:
+        async with semaphore:
+            await get_or_create_ticket(telegram_id, lottery)
+
+    await asyncio.gather(*(tap(telegram_id) for telegram_id in telegram_ids for _ in range(taps)))
+    await engine.dispose()
+
+
+async def prepare(users: int) -> None:
+    from sqlalchemy import text
+
+    from models.database import AsyncSession, engine
+
+    async with AsyncSession() as session:
+        await session.execute(text(
+            "INSERT INTO users (telegram_id, full_name, full_name_from_tg, username, is_active) "
+            "SELECT :first + n, '', '', '', true FROM generate_series(0, :users - 1) AS n "
+            "ON CONFLICT (telegram_id) DO NOTHING"
+        ), {"first": CHECK_TELEGRAM_ID, "users": users})
+        await session.commit()
+    await engine.dispose()  # Соединения пула привязаны к циклу событий этого asyncio.run
+
+
+async def verify(lottery_name: str, users: int) -> list[tuple[str, bool, object]]:
+    from sqlalchemy import func, select
+
+    from models.database import AsyncSession, engine
+    from models.models import Lottery, Ticket
+
+    async with AsyncSession() as session:
+        lottery_id = await session.scalar(select(Lottery.id).where(Lottery.name == lottery_name))
+        result = (await session.execute(
+            select(
+                func.count(),
+                func.count(func.distinct(Ticket.ticket_number)),
+                func.count(func.distinct(Ticket.user_id))
+            ).where(Ticket.lottery_id == lottery_id)
+        )).one()
+    await engine.dispose()
+    tickets, numbers, holders = result
+    return [
+        ("у каждого пользователя есть билет", holders == users, f"{holders} из {users}"),
+        ("у пользователя не больше одного билета", tickets == holders, f"{tickets} билетов"),
+        ("номера билетов не повторяются", numbers == tickets, f"{numbers} разных номеров"),
+    ]
+
+
+async def cleanup(lottery_name: str, users: int) -> None:
+    from sqlalchemy import delete, select, text
+
+    from models.database import AsyncSession, engine
+    from models.models import Lottery, TicketCounter, User, ticket_partition_name
+
+    async with AsyncSession() as session:
+        lottery_id = await session.scalar(select(Lottery.id).where(Lottery.name == lottery_name))
+        await session.execute(text(f"DROP TABLE IF EXISTS {ticket_partition_name(lottery_id)}"))
+        await session.execute(delete(TicketCounter).where(TicketCounter.lottery_id == lottery_id))
+        await session.execute(delete(Lottery).where(Lottery.id == lottery_id))
+        await session.execute(delete(User).where(
+            User.telegram_id.between(CHECK_TELEGRAM_ID, CHECK_TELEGRAM_ID + users - 1)
+        ))
+        await session.commit()
+    await engine.dispose()
+
+
+def main(args: argparse.Namespace) -> int:
+    from models.database import get_sync_sessionmaker
+    from utils.utils_for_db import create_lottery
+
+    lottery_name = f"uniqueness-check-{int(time.time())}"
+    with get_sync_sessionmaker()() as sync_session:
+        create_lottery(sync_session, lottery_name, description="Проверка уникальности номеров")
+    asyncio.run(prepare(args.users))
+
+    try:
+        telegram_ids = list(range(CHECK_TELEGRAM_ID, CHECK_TELEGRAM_ID + args.users))
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=issue_tickets, args=(
+                lottery_name, telegram_ids[index::args.processes], args.taps, args.concurrency
+            ))
+            for index in range(args.processes)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        print(f"Выдача заняла {time.perf_counter() - started:.2f} с")
+
+        checks = asyncio.run(verify(lottery_name, args.users))
+    finally:
+        if not args.keep:
+            asyncio.run(cleanup(lottery_name, args.users))
+
+    for name, ok, details in checks:
+        print(f"{'ok' if ok else 'FAIL':>4} | {name}: {details}")
+    return 0 if all(ok for _, ok, _ in checks) else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--taps", type=int, default=2, help="Сколько раз каждый пользователь запрашивает билет")
+    parser.add_argument("--concurrency", type=int, default=100, help="Одновременных запросов в процессе")
+    parser.add_argument("--block-size", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Не удалять созданные данные")
+    arguments = parser.parse_args()
+
+    # Настройки читаются при импорте модулей бота, поэтому окружение задаётся до него
+    # (процессы spawn наследуют окружение)
+    os.environ["TICKET_BLOCK_SIZE"] = str(arguments.block_size)
+    sys.exit(main(arguments))
@@ -0,0 +1,179 @@
+"""
+Рассылка сообщения всем участникам лотереи.
+
+Получатели читаются из БД страницами по users.id, а после каждой страницы в broadcasts
+сохраняется последний обработанный users.id и статусы доставки в broadcast_deliveries.
+Прерванную рассылку можно продолжить с места остановки: повторно сообщение получат
+не больше одной страницы получателей.
+
+Рассылка идёт отдельным процессом со своим планировщиком, поэтому приоритет BULK не уступает
+ответам бота. Вместо этого лимиты разделены: рассылка отправляет не больше
+OUTBOUND_BROADCAST_RATE сообщений в секунду, а бот — остаток OUTBOUND_RATE (см. bot_rate).
+
+Запуск:
+    python -m broadcast.broadcast --lottery "Имя лотереи" --text "Текст" [--dry-run]
+    python -m broadcast.broadcast --resume 12
+"""
+import argparse
+import asyncio
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from config import settings
+from models.database import AsyncSession, engine
+from models.models import Broadcast, BroadcastDelivery, Lottery, Ticket, User
+from utils.fake_session import FakeSession
+from utils.outbound import BULK, OutboundScheduler
+
+from logs.logging_config import logger
+
+
+async def create_broadcast(lottery_name: str, text: str, dry_run: bool = False) -> int | None:
+    """
+    Создаёт рассылку для участников лотереи
+    :param lottery_name: str:
+    :param text: str:
+    :param dry_run: bool:
+    :return: id рассылки или None, если лотерея не найдена:
+    """
+    async with AsyncSession() as session:
+        lottery_id = await session.scalar(select(Lottery.id).where(Lottery.name == lottery_name))
+        if lottery_id is None:
+            logger.error(f"Лотерея с именем {lottery_name} не найдена.")
+            return None
+
+        broadcast = Broadcast(lottery_id=lottery_id, text=text, dry_run=dry_run)
+        session.add(broadcast)
+        await session.commit()
+        return broadcast.id
+
+
+async def iter_recipients(lottery_id: int, after_user_id: int, page_size: int):
+    """
+    Отдаёт активных участников лотереи страницами по page_size, начиная после after_user_id
+    :return: списки пар (users.id, telegram_id):
+    """
+    while True:
+        async with AsyncSession() as session:
+            query = (
+                select(User.id, User.telegram_id)
+                .join(Ticket, Ticket.user_id == User.id)
+                .where(Ticket.lottery_id == lottery_id, User.is_active.is_(True), User.id > after_user_id)
+                .order_by(User.id)
+                .limit(page_size)
+            )
+            page = (await session.execute(query)).all()
+        if not page:
+            return
+        yield page
+        after_user_id = page[-1].id
+
+
+async def _deliver(scheduler: OutboundScheduler, semaphore: asyncio.Semaphore, user_id: int,
+                   telegram_id: int, text: str) -> dict:
+    async with semaphore:
+        try:
+            await scheduler.send(SendMessage(chat_id=telegram_id, text=text), priority=BULK)
+            status, error = "sent", ""
+        except TelegramForbiddenError as e:
+            status, error = "blocked", e.message
+        except Exception as e:
+            # Сетевые ошибки и ошибки сервера Telegram тоже только отмечаются: исключение
+            # прервало бы gather страницы вместе с уже полученными результатами
+            status, error = "failed", getattr(e, "message", None) or repr(e)
+    return {"user_id": user_id, "status": status, "error": error}
+
+
+async def run_broadcast(broadcast_id: int, scheduler: OutboundScheduler, concurrency: int, page_size: int) -> dict:
+    """
+    Отправляет рассылку, продолжая с сохранённой позиции
+    :return: количество получателей по статусам доставки:
+    """
+    async with AsyncSession() as session:
+        broadcast = await session.get(Broadcast, broadcast_id)
+        if broadcast is None:
+            logger.error(f"Рассылка {broadcast_id} не найдена.")
+            return {}
+        broadcast.status = "running"
+        await session.commit()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    totals = {"sent": 0, "blocked": 0, "failed": 0}
+    async for page in iter_recipients(broadcast.lottery_id, broadcast.last_user_id, page_size):
+        results = await asyncio.gather(*(
+            _deliver(scheduler, semaphore, row.id, row.telegram_id, broadcast.text)
+            for row in page
+        ))
+
+        # Статусы и позиция сохраняются одной транзакцией: после сбоя страница отправляется заново целиком
+        async with AsyncSession() as session:
+            query_deliveries = insert(BroadcastDelivery).values(
+                [{"broadcast_id": broadcast_id, **result} for result in results]
+            ).on_conflict_do_nothing()
+            await session.execute(query_deliveries)
+            await session.execute(
+                update(Broadcast).where(Broadcast.id == broadcast_id).values(last_user_id=page[-1].id)
+            )
+            await session.commit()
+
+        for result in results:
+            totals[result["status"]] += 1
+        logger.info(f"Рассылка {broadcast_id}: обработаны получатели до users.id={page[-1].id}, итого {totals}")
+
+    async with AsyncSession() as session:
+        await session.execute(update(Broadcast).where(Broadcast.id == broadcast_id).values(status="done"))
+        await session.commit()
+    return totals
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.resume:
+        broadcast_id = args.resume
+        async with AsyncSession() as session:
+            dry_run = await session.scalar(select(Broadcast.dry_run).where(Broadcast.id == broadcast_id))
+    else:
+        broadcast_id = await create_broadcast(args.lottery, args.text, dry_run=args.dry_run)
+        dry_run = args.dry_run
+    if broadcast_id is None:
+        return
+
+    session = FakeSession() if dry_run else None
+    bot = Bot(token=settings.API_TELEGRAM_TOKEN, session=session)
+    scheduler = OutboundScheduler(
+        bot=bot,
+        rate=args.rate,
+        chat_rate=settings.OUTBOUND_CHAT_RATE,
+        chat_burst=settings.OUTBOUND_CHAT_BURST
+    )
+    try:
+        totals = await run_broadcast(broadcast_id, scheduler, concurrency=args.concurrency, page_size=args.page_size)
+        logger.info(f"Рассылка {broadcast_id} завершена{' (dry run)' if dry_run else ''}: {totals}")
+    finally:
+        await scheduler.close()
+        await bot.session.close()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Рассылка участникам лотереи")
+    parser.add_argument("--lottery", default=settings.LOTTERY_NAME)
+    parser.add_argument("--text")
+    parser.add_argument("--resume", type=int, help="id прерванной рассылки")
+    parser.add_argument("--dry-run", action="store_true", help="отправлять через FakeSession, без Telegram")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=500)
+    # Бот в это время отвечает пользователям, поэтому рассылке остаётся часть общего лимита
+    parser.add_argument("--rate", type=float, default=settings.OUTBOUND_BROADCAST_RATE,
+                        help="не больше OUTBOUND_BROADCAST_RATE")
+    arguments = parser.parse_args()
+    if not arguments.resume and not arguments.text:
+        parser.error("нужен --text или --resume")
+    if arguments.rate > settings.OUTBOUND_BROADCAST_RATE:
+        parser.error(f"--rate больше OUTBOUND_BROADCAST_RATE ({settings.OUTBOUND_BROADCAST_RATE}): "
+                     f"рассылка заняла бы лимит, оставленный боту")
+    asyncio.run(main(arguments))
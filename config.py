@@ -8,7 +8,53 @@ class Settings(BaseSettings):
     CHANNEL_ID_MIRAN: str
     CHANNEL_LINK_REG_BOT: str
 
+    LOG_LEVEL: str = "INFO"  # Уровень вывода в консоль; DEBUG — подробности каждого обновления
+    LOG_FILE_LEVEL: str = "INFO"  # Уровень записи в logs/app.log
+    LOG_SERIALIZE: bool = False  # Писать logs/app.log в JSON со всеми полями записи
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # Доля обновлений, для которых сохраняются записи DEBUG
+
+    BOT_MODE: str = "polling"  # polling — long polling, webhook — приём обновлений HTTP-сервером
+    WEBHOOK_BASE_URL: str = ""  # Публичный адрес сервера; если пусто, webhook в Telegram не регистрируется
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: SecretStr = SecretStr("")  # Значение заголовка X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_MAX_CONCURRENCY: int = 200  # Сколько обновлений обрабатывается одновременно
+    WEBHOOK_SHUTDOWN_TIMEOUT: float = 30  # Сколько секунд ждать незавершённые обработчики при остановке
+
+    OUTBOUND_RATE: float = 30  # Сообщений в секунду на всего бота (лимит Bot API)
+    OUTBOUND_CHAT_RATE: float = 1  # Сообщений в секунду в один чат
+    OUTBOUND_CHAT_BURST: int = 3  # Сколько сообщений подряд можно отправить в чат без ожидания
+    OUTBOUND_BROADCAST_RATE: float = 5  # Часть OUTBOUND_RATE, отданная процессу рассылки; боту остаётся разница
+
+    WORKERS: int = 1  # Больше 1 — обновления распределяются по процессам-воркерам по from_user.id; OUTBOUND_RATE делится между ними
+    WORKER_MAX_CONCURRENCY: int = 200  # Сколько обновлений один воркер обрабатывает одновременно
+
+    METRICS_ENABLED: bool = True  # Отдавать /metrics, /health и /ready на METRICS_HOST:METRICS_PORT
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9108  # Воркеры занимают следующие порты: METRICS_PORT + номер воркера
+
+    STARTUP_PREWARM_CONNECTIONS: int = 5  # Сколько соединений пула открыть при запуске (не больше DB_POOL_SIZE)
+    HEALTH_CHECK_TIMEOUT: float = 5  # Сколько секунд ждать ответа БД и Bot API при проверках
+
+    MEMBERSHIP_CACHE_POSITIVE_TTL: float = 300  # Сколько секунд помнить, что пользователь подписан
+    MEMBERSHIP_CACHE_NEGATIVE_TTL: float = 15  # Сколько секунд помнить, что пользователь не подписан
+    MEMBERSHIP_CACHE_MAX_SIZE: int = 50000
+
+    FSM_STORAGE: str = "postgres"  # postgres — состояния в БД, memory — в памяти процесса
+    FSM_STATE_TTL: float = 86400  # Через сколько секунд без изменений состояние регистрации удаляется
+    FSM_FLUSH_DELAY: float = 0.2  # Сколько секунд копить изменения состояния перед записью в БД
+
     LOTTERY_NAME: str
+    LOTTERY_CACHE_TTL: float = 60  # Через сколько секунд перечитывать лотерею из БД
+    TICKET_BLOCK_SIZE: int = 20  # Сколько номеров билетов процесс резервирует в БД за один запрос
+    LOTTERY_STATS_RECONCILE_INTERVAL: float = 60  # Раз в сколько секунд сверять статистику /stats с БД
+
+    ADMIN_IDS: str = ""  # telegram_id администраторов через запятую, им доступна команда /stats
+
+    USER_WRITE_BUFFER: bool = False  # Записывать новых пользователей группами (save_user через UserWriteBuffer)
+    USER_WRITE_BUFFER_SIZE: int = 100  # Сколько строк записывать одним INSERT
+    USER_WRITE_BUFFER_DELAY: float = 0.005  # Сколько секунд ждать, пока наберётся группа
 
     DB_USER_PSQL: str
     DB_PASSWORD_PSQL: SecretStr
@@ -16,6 +62,21 @@ class Settings(BaseSettings):
     DB_PORT_PSQL: int
     DB_DATABASE_PSQL: str
 
+    DB_ECHO: bool = False  # Выводить все SQL-запросы в консоль (только для отладки)
+    DB_POOL_SIZE: int = 10  # Постоянные соединения в пуле
+    DB_MAX_OVERFLOW: int = 20  # Дополнительные соединения сверх DB_POOL_SIZE при пиковой нагрузке
+    DB_POOL_TIMEOUT: float = 30  # Сколько секунд ждать свободное соединение
+    DB_POOL_RECYCLE: int = 1800  # Через сколько секунд переоткрывать соединение
+    DB_POOL_PRE_PING: bool = True  # Проверять соединение перед выдачей из пула
+    DB_STATEMENT_CACHE_SIZE: int = 500  # Размер кэша подготовленных выражений asyncpg на соединение
+
+    # Реплика только для чтения; если не заданы ни хост, ни база, все запросы идут в основную БД.
+    # Пустые значения берутся из основной БД: для проверки на одном сервере достаточно указать базу
+    DB_REPLICA_HOST_PSQL: str = ""
+    DB_REPLICA_PORT_PSQL: int = 0
+    DB_REPLICA_DATABASE_PSQL: str = ""
+    READ_YOUR_WRITES_WINDOW: float = 5  # Сколько секунд после записи пользователя читать его данные из основной БД
+
     SMTP_SERVER: str
     PORT: int
     SENDER_EMAIL: str
@@ -24,6 +85,10 @@ class Settings(BaseSettings):
     BODY: str
     TO_EMAIL: str
     TO_EMAILS: str
+    EMAIL_NOTIFY_REGISTRATIONS: bool = False  # Отправлять ФИО, имя и username новых участников на TO_EMAILS
+    EMAIL_BATCH_SIZE: int = 1  # Больше 1 — несколько регистраций объединяются в одно письмо-дайджест
+    EMAIL_BATCH_INTERVAL: float = 60  # Сколько секунд ждать регистрации для дайджеста
+    EMAIL_QUEUE_SIZE: int = 10000  # Сколько неотправленных уведомлений держать в памяти
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
 
 
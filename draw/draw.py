@@ -0,0 +1,199 @@
+"""
+Розыгрыш победителей лотереи с проверяемым результатом (commit-reveal).
+
+1. До розыгрыша организатор выполняет `python -m draw.draw commit`, хранит seed в секрете
+   и публикует commitment = sha256(seed).
+2. После закрытия лотереи выполняется
+   `python -m draw.draw run --lottery "Имя" --winners 3 --seed <seed> --commitment <commitment>`,
+   после чего публикуется seed. Любой может проверить, что sha256(seed) совпадает с
+   опубликованным commitment, и повторить розыгрыш на тех же данных с тем же результатом.
+
+Участвуют только билеты активных пользователей (User.is_active). Вся лотерея в память
+не загружается: если номера билетов идут почти без пропусков, случайные номера из диапазона
+проверяются пачками по индексу, иначе билеты читаются курсором и выбираются reservoir sampling.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import secrets
+from dataclasses import asdict, dataclass, field
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from config import settings
+from models.database import AsyncSession, engine
+from models.models import Lottery, Ticket, User
+
+from logs.logging_config import logger
+
+
+MIN_DENSITY = 0.5  # Доля существующих номеров в диапазоне, при которой выгоднее выборка по индексу
+
+
+class DeterministicRandom:
+    """
+    Генератор случайных чисел на HMAC-SHA256 от seed: последовательность определяется
+    только seed и context и не зависит от версии Python
+    """
+
+    def __init__(self, seed: bytes, context: str):
+        self._key = hmac.new(seed, context.encode(), hashlib.sha256).digest()
+        self._counter = 0
+
+    def _next_uint64(self) -> int:
+        block = hmac.new(self._key, self._counter.to_bytes(8, "big"), hashlib.sha256).digest()
+        self._counter += 1
+        return int.from_bytes(block[:8], "big")
+
+    def randbelow(self, n: int) -> int:
+        """Равномерно распределённое целое число из [0, n)"""
+        limit = 2 ** 64 - 2 ** 64 % n  # Отбрасываем хвост, чтобы не было смещения
+        while True:
+            value = self._next_uint64()
+            if value < limit:
+                return value % n
+
+
+@dataclass
+class DrawResult:
+    lottery_name: str
+    commitment: str
+    seed: str
+    method: str  # index — выборка номеров по индексу, reservoir — проход курсором
+    eligible: int  # Количество билетов, участвовавших в розыгрыше
+    winners: list[dict] = field(default_factory=list)  # В порядке выбора: первый — первое место
+
+
+def generate_seed() -> bytes:
+    return secrets.token_bytes(32)
+
+
+def make_commitment(seed: bytes) -> str:
+    return hashlib.sha256(seed).hexdigest()
+
+
+def _eligible_tickets(lottery_name: str):
+    return (
+        select(Ticket.ticket_number, User.telegram_id)
+        .join(Ticket.user)
+        .join(Ticket.lottery)
+        .where(Lottery.name == lottery_name, User.is_active.is_(True))
+    )
+
+
+async def _draw_by_index(rng: DeterministicRandom, lottery_name: str, winners: int, low: int, high: int,
+                         density: float) -> list[dict]:
+    """
+    Берёт случайные номера из [low, high] по очереди и оставляет существующие билеты.
+    Номера проверяются пачками, но результат совпадает с проверкой по одному.
+    """
+    chosen: dict[int, int] = {}
+    async with AsyncSession() as session:
+        while len(chosen) < winners:
+            batch_size = max(16, int((winners - len(chosen)) / density * 2))
+            candidates = [low + rng.randbelow(high - low + 1) for _ in range(batch_size)]
+            query = _eligible_tickets(lottery_name).where(Ticket.ticket_number.in_(set(candidates)))
+            found = dict((await session.execute(query)).tuples().all())
+            for number in candidates:
+                if number in found and number not in chosen:
+                    chosen[number] = found[number]
+                    if len(chosen) == winners:
+                        break
+    return [{"ticket_number": number, "telegram_id": telegram_id} for number, telegram_id in chosen.items()]
+
+
+async def _draw_by_reservoir(rng: DeterministicRandom, lottery_name: str, winners: int) -> list[dict]:
+    """
+    Reservoir sampling (алгоритм R) по билетам в порядке номеров, прочитанным курсором.
+    Алгоритм R выбирает равновероятный набор, но в резервуаре билеты остаются в порядке номеров,
+    поэтому места распределяются перемешиванием Фишера — Йетса тем же rng
+    """
+    reservoir: list[dict] = []
+    async with AsyncSession() as session:
+        query = _eligible_tickets(lottery_name).order_by(Ticket.ticket_number).execution_options(yield_per=5000)
+        result = await session.stream(query)
+        index = 0
+        async for row in result:
+            item = {"ticket_number": row.ticket_number, "telegram_id": row.telegram_id}
+            if index < winners:
+                reservoir.append(item)
+            else:
+                position = rng.randbelow(index + 1)
+                if position < winners:
+                    reservoir[position] = item
+            index += 1
+
+    for i in range(len(reservoir) - 1, 0, -1):
+        j = rng.randbelow(i + 1)
+        reservoir[i], reservoir[j] = reservoir[j], reservoir[i]
+    return reservoir
+
+
+async def draw_winners(lottery_name: str, winners: int, seed: bytes, commitment: str | None = None) -> DrawResult:
+    """
+    Выбирает winners разных билетов лотереи
+    :param lottery_name: str:
+    :param winners: int:
+    :param seed: bytes: раскрытый seed
+    :param commitment: str: опубликованный ранее sha256(seed), если указан — проверяется
+    :return: DrawResult:
+    """
+    if commitment is not None and not hmac.compare_digest(make_commitment(seed), commitment.lower()):
+        raise ValueError("seed не соответствует опубликованному commitment")
+
+    async with AsyncSession() as session:
+        query = _eligible_tickets(lottery_name).with_only_columns(
+            func.count(), func.min(Ticket.ticket_number), func.max(Ticket.ticket_number)
+        )
+        eligible, low, high = (await session.execute(query)).one()
+
+    result = DrawResult(
+        lottery_name=lottery_name,
+        commitment=make_commitment(seed),
+        seed=seed.hex(),
+        method="index",
+        eligible=eligible
+    )
+    if eligible == 0:
+        return result
+
+    winners = min(winners, eligible)
+    rng = DeterministicRandom(seed, context=lottery_name)
+    density = eligible / (high - low + 1)
+    if density >= MIN_DENSITY:
+        result.winners = await _draw_by_index(rng, lottery_name, winners, low, high, density)
+    else:
+        result.method = "reservoir"
+        result.winners = await _draw_by_reservoir(rng, lottery_name, winners)
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        result = await draw_winners(args.lottery, args.winners, bytes.fromhex(args.seed), args.commitment)
+        logger.info(f"Розыгрыш лотереи {args.lottery}: {len(result.winners)} победителей из {result.eligible} билетов")
+        print(json.dumps(asdict(result), ensure_ascii=False, indent=2))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Розыгрыш победителей лотереи")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("commit", help="сгенерировать seed и commitment")
+    run_parser = commands.add_parser("run", help="провести розыгрыш")
+    run_parser.add_argument("--lottery", default=settings.LOTTERY_NAME)
+    run_parser.add_argument("--winners", type=int, required=True)
+    run_parser.add_argument("--seed", required=True, help="seed в hex")
+    run_parser.add_argument("--commitment", help="опубликованный sha256(seed) в hex")
+    arguments = parser.parse_args()
+
+    if arguments.command == "commit":
+        new_seed = generate_seed()
+        print(f"seed (держать в секрете до розыгрыша): {new_seed.hex()}")
+        print(f"commitment (опубликовать):             {make_commitment(new_seed)}")
+    else:
+        asyncio.run(main(arguments))
@@ -0,0 +1,82 @@
+"""
+Выгрузка участников лотереи в CSV или XLSX.
+
+Строки читаются из БД частями (iter_lottery_data) и сразу пишутся в файл,
+поэтому потребление памяти не зависит от размера лотереи.
+
+Запуск: python -m export.export --lottery "Имя лотереи" --format xlsx --output participants.xlsx
+"""
+import argparse
+import asyncio
+import csv
+
+from config import settings
+from models.database import engine
+from utils.utils_for_db import iter_lottery_data
+
+from logs.logging_config import logger
+
+
+EXPORT_COLUMNS = ("ticket_number", "telegram_id", "full_name", "full_name_from_tg", "lottery_name")
+
+
+async def write_csv(chunks, path: str) -> int:
+    """
+    Пишет части строк в CSV-файл
+    :param chunks: асинхронный итератор списков словарей:
+    :param path: str:
+    :return: количество записанных строк:
+    """
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as file:  # utf-8-sig — чтобы Excel открыл кириллицу
+        writer = csv.DictWriter(file, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        async for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+async def write_xlsx(chunks, path: str) -> int:
+    """
+    Пишет части строк в XLSX-файл в потоковом режиме openpyxl (write_only)
+    :param chunks: асинхронный итератор списков словарей:
+    :param path: str:
+    :return: количество записанных строк:
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("Для выгрузки в XLSX установите openpyxl: pip install openpyxl")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Участники")
+    sheet.append(EXPORT_COLUMNS)
+    count = 0
+    async for chunk in chunks:
+        for row in chunk:
+            sheet.append([row[column] for column in EXPORT_COLUMNS])
+        count += len(chunk)
+    workbook.save(path)
+    return count
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+
+async def main(args: argparse.Namespace) -> None:
+    output = args.output or f"participants.{args.format}"
+    try:
+        count = await WRITERS[args.format](iter_lottery_data(args.lottery, chunk_size=args.chunk_size), output)
+        logger.info(f"Выгружено {count} участников лотереи {args.lottery} в {output}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Выгрузка участников лотереи")
+    parser.add_argument("--lottery", default=settings.LOTTERY_NAME)
+    parser.add_argument("--format", choices=WRITERS, default="csv")
+    parser.add_argument("--output")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -1,10 +1,12 @@
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import CommandStart
+from aiogram.types import Message, CallbackQuery, ChatMemberUpdated
+from aiogram.filters import Command, CommandStart
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
 from config import settings
-from init_bot import router, bot
+from init_bot import router
+from middleware.middleware import CallbackCoalescingMiddleware, DbSessionMiddleware, HandlerMetricsMiddleware
+from models.database import DbSession
 
 from keyboards.keyboards import (
     get_inline_keyboard_enter_data,
@@ -13,18 +15,31 @@ from keyboards.keyboards import (
     get_inline_keyboard_get_number_of_ticket,
     get_inline_keyboard_link_to_bot_registration
 )
+from utils.lottery_cache import lottery_cache
+from utils.lottery_stats import lottery_stats
+from utils.membership_cache import membership_cache, SUBSCRIBED_STATUSES
+from utils.notifications import email_notifier
+from utils.outbound import outbound
 from utils.utils import get_data_user
 from validators.validators import validate_string
 from utils.utils_for_db import (
     is_exists_user,
-    check_user_ticket,
-    create_ticket,
-    get_user_by_telegram_id,
-    save_user,
-    get_lottery_by_name,
-    get_number_ticket_current_lottery
+    get_or_create_ticket,
+    save_user
 )
 
+from logs.logging_config import logger
+
+
+router.callback_query.outer_middleware(CallbackCoalescingMiddleware())  # До сессии БД: дубликатам она не нужна
+router.message.outer_middleware(DbSessionMiddleware())
+router.callback_query.outer_middleware(DbSessionMiddleware())
+router.message.middleware(HandlerMetricsMiddleware())
+router.callback_query.middleware(HandlerMetricsMiddleware())
+router.chat_member.middleware(HandlerMetricsMiddleware())
+
+ADMIN_IDS = {int(admin_id) for admin_id in settings.ADMIN_IDS.split(",") if admin_id.strip()}
+
 
 class Registration(StatesGroup):
     check_user_state = State()
@@ -38,59 +53,76 @@ class Registration(StatesGroup):
 @router.message(CommandStart())
 async def cmd_start(message: Message):
     keyboard = get_inline_keyboard_check_user_state()
-    await message.answer(
+    outbound.enqueue(message.answer(
         text=f"Пожалуйста, проверьте вашу подписку на наш корпоративный Telegram-канал\n"
              f'Для проверки нажмите кнопку "Проверка подписки"',
         reply_markup=keyboard
-    )
+    ))
+
+
+@router.message(Command("stats"), lambda m: m.from_user.id in ADMIN_IDS)
+async def cmd_stats(message: Message):
+    # Ответ берётся из счётчиков в памяти, без запросов к БД
+    stats = lottery_stats.snapshot()
+    reconciled = lottery_stats.reconciled.strftime("%H:%M:%S") if lottery_stats.reconciled else "ещё не было"
+    outbound.enqueue(message.answer(
+        f"Лотерея: {lottery_stats.lottery_name or settings.LOTTERY_NAME}\n"
+        f"Выдано билетов: {stats['tickets']}\n"
+        f"Зарегистрировано пользователей: {stats['registrations']}\n"
+        f"Билетов за последнюю минуту: {stats['rate_per_minute']}\n"
+        f"Последний номер: {stats['last_ticket_number'] or '—'}\n"
+        f"Сверка с БД: {reconciled}"
+    ))
 
 
 @router.callback_query(lambda c: c.data == "check_user_state")
-async def process_check_user_state(callback_query: CallbackQuery, state: FSMContext):
+async def process_check_user_state(callback_query: CallbackQuery, state: FSMContext, session: DbSession):
     keyboard = get_inline_keyboard_get_number_of_ticket()
     await state.set_state(Registration.check_user_state)
 
     user_id = callback_query.from_user.id
-    status = await bot.get_chat_member(
-        chat_id=settings.CHANNEL_ID_MIRAN,
-        user_id=user_id,
-        request_timeout=10
-    )
-    print(f"status---------------{status}---------------")
+    status = await membership_cache.get_status(user_id)
+    logger.debug("Статус подписки: {status}", status=status)
 
-    if status.status in ('member', 'creator', 'administrator'):
-        if await is_exists_user(telegram_id=user_id):
-            print(f"---------------Юзер подписан и есть в БД---------------")
+    if status in SUBSCRIBED_STATUSES:
+        if await is_exists_user(telegram_id=user_id, session=session):
+            logger.debug("Пользователь подписан и есть в БД")
             await state.set_state(Registration.get_number_of_ticket)
-            await callback_query.message.answer(
+            outbound.enqueue(callback_query.message.answer(
                 'Мы успешно проверили вашу подписку.\nЧтобы получить номер для участия в розыгрыше умного проектора нажмите на "Получить номер":',
-                reply_markup=keyboard)
+                reply_markup=keyboard))
         else:
-            print("---------------Юзер подписан на канал, но его нет в БД---------------")
+            logger.debug("Пользователь подписан на канал, но его нет в БД")
             keyboard_input_data = get_inline_keyboard_enter_data()
-            await callback_query.message.answer(
+            outbound.enqueue(callback_query.message.answer(
                 'Для участия в розыгрыше умного проектора введите ваши ФИО',
-                reply_markup=keyboard_input_data)
+                reply_markup=keyboard_input_data))
 
     else:
-        print("---------------Юзера нет на канале и нет в БД (Абсолютно новый "
-              "пользователь)---------------")
+        logger.debug("Пользователь не подписан на канал")
         keyboard_with_link_to_bot_registration = get_inline_keyboard_link_to_bot_registration()
-        await callback_query.message.answer(
+        outbound.enqueue(callback_query.message.answer(
             'Вы не подписаны на наш канал. Пожалуйста, зарегистрируйтесь по кнопки ниже, '
             'чтобы принять участие в розыгрыше.',
             reply_markup=keyboard_with_link_to_bot_registration
-        )
+        ))
 
     await callback_query.answer()
 
 
+@router.chat_member()
+async def process_chat_member_updated(event: ChatMemberUpdated):
+    # Telegram присылает chat_member, только если бот администратор канала
+    if settings.CHANNEL_ID_MIRAN in (str(event.chat.id), f"@{event.chat.username}"):
+        membership_cache.set_status(event.new_chat_member.user.id, event.new_chat_member.status)
+
+
 @router.callback_query(lambda c: c.data == "waiting_for_consent")
 async def process_ask_for_consent(callback_query: CallbackQuery, state: FSMContext):
     keyboard = get_inline_keyboard_yes_no()
     await state.set_state(Registration.waiting_for_consent)
-    await callback_query.message.answer("Я согласен на обработку персональных данных",
-                                        reply_markup=keyboard)
+    outbound.enqueue(callback_query.message.answer("Я согласен на обработку персональных данных",
+                                                   reply_markup=keyboard))
     await callback_query.answer()
 
 
@@ -98,15 +130,15 @@ async def process_ask_for_consent(callback_query: CallbackQuery, state: FSMConte
 async def process_choose_yes_or_no(callback_query: CallbackQuery, state: FSMContext):
     if callback_query.data == "yes":
         await state.set_state(Registration.last_name)
-        await callback_query.message.answer("Введите вашу фамилию (только русские символы):")
+        outbound.enqueue(callback_query.message.answer("Введите вашу фамилию (только русские символы):"))
         await callback_query.answer()
 
     else:
         await callback_query.message.delete()
-        await callback_query.message.answer(
+        outbound.enqueue(callback_query.message.answer(
             f"Очень жаль. Надеемся, Вы передумаете.",
             reply_markup=get_inline_keyboard_enter_data()
-            )
+            ))
         await callback_query.answer()
         await state.clear()
 
@@ -114,79 +146,84 @@ async def process_choose_yes_or_no(callback_query: CallbackQuery, state: FSMCont
 @router.message(Registration.last_name)
 async def process_input_last_name(message: Message,  state: FSMContext):
     if not await validate_string(message):
-        await message.answer("только русские символы")
+        outbound.enqueue(message.answer("только русские символы"))
         return
 
     await state.update_data(last_name=message.text.strip())
     await state.set_state(Registration.first_name)
-    await message.answer("Введите ваше имя (только русские символы):")
+    outbound.enqueue(message.answer("Введите ваше имя (только русские символы):"))
 
 
 @router.message(Registration.first_name)
 async def process_input_first_name(message: Message,  state: FSMContext):
     if not await validate_string(message):
-        await message.answer("только русские буквы")
+        outbound.enqueue(message.answer("только русские буквы"))
         return
 
     await state.update_data(first_name=message.text.strip())
     await state.set_state(Registration.middle_name)
-    await message.answer("Введите ваше отчество (только русские символы):")
+    outbound.enqueue(message.answer("Введите ваше отчество (только русские символы):"))
 
 
 @router.message(Registration.middle_name)
-async def process_input_middle_name(message: Message,  state: FSMContext):
+async def process_input_middle_name(message: Message,  state: FSMContext, session: DbSession):
     if not await validate_string(message):
-        await message.answer("только русские буквы")
+        outbound.enqueue(message.answer("только русские буквы"))
         return
 
     await state.update_data(middle_name=message.text.strip())
     data = await state.get_data()
     telegram_id, full_name, full_name_from_tg, username = await get_data_user(message, data)
 
-    user = await get_user_by_telegram_id(telegram_id=telegram_id)
-    print(f"---------------user---------------{user}---------------")
-    if not user:
-        await save_user(
+    is_exists = await is_exists_user(telegram_id=telegram_id, session=session)
+    logger.debug("Пользователь есть в БД: {is_exists}", is_exists=is_exists)
+    if not is_exists:
+        saved = await save_user(
             telegram_id=telegram_id,
             full_name=full_name,
             full_name_from_tg=full_name_from_tg,
-            username=username
+            username=username,
+            session=session
         )
-        print(f"---------------Save User---------------")
+        if saved:
+            if settings.EMAIL_NOTIFY_REGISTRATIONS:
+                email_notifier.notify_registration(telegram_id, full_name, full_name_from_tg, username)
+            logger.info("Зарегистрирован новый пользователь")
 
     keyboard = get_inline_keyboard_get_number_of_ticket()
-    await message.answer('Благодарим за информацию\nЧтобы получить номер для участия в '
-                         'розыгрыше умного проектора '
-                         'нажмите на "Получить номер":',
-                         reply_markup=keyboard)
+    outbound.enqueue(message.answer('Благодарим за информацию\nЧтобы получить номер для участия в '
+                                    'розыгрыше умного проектора '
+                                    'нажмите на "Получить номер":',
+                                    reply_markup=keyboard))
     await state.clear()
 
 
 @router.callback_query(lambda c: c.data == "get_number_of_ticket")
-async def process_get_number_of_ticket(callback_query: CallbackQuery, state: FSMContext):
+async def process_get_number_of_ticket(callback_query: CallbackQuery, state: FSMContext, session: DbSession):
     telegram_id = callback_query.from_user.id
 
-    has_ticket = await check_user_ticket(
+    lottery = await lottery_cache.get(settings.LOTTERY_NAME)
+    if lottery is None:
+        outbound.enqueue(callback_query.message.answer("Розыгрыш сейчас не проводится."))
+        await state.clear()
+        await callback_query.answer()
+        return
+
+    ticket_number, is_new = await get_or_create_ticket(
         telegram_id=telegram_id,
-        lottery_name=settings.LOTTERY_NAME
+        lottery=lottery,
+        session=session
     )
-    print(f"has_ticket------------------{has_ticket}------------------")
-
-    lottery = await get_lottery_by_name(lottery_name=settings.LOTTERY_NAME)
-    user = await get_user_by_telegram_id(telegram_id=telegram_id)
+    logger.debug("Номер билета {ticket_number}, новый: {is_new}", ticket_number=ticket_number, is_new=is_new)
 
-    if has_ticket:
-        ticket_number = await get_number_ticket_current_lottery(
-            lottery=lottery,
-            user=user,
-        )
-        await callback_query.message.answer(f"Вы уже участвуете в лотерее.\nВаш номер {ticket_number}")
+    if ticket_number is None:
+        outbound.enqueue(callback_query.message.answer(
+            "Не удалось получить номер участия. Попробуйте ещё раз позже."))
+    elif is_new:
+        outbound.enqueue(callback_query.message.answer(f"Ваш номер участия: {ticket_number}"))
     else:
-        ticket_number = await create_ticket(
-            lottery=lottery,
-            user=user,
-        )
-        await callback_query.message.answer(f"Ваш номер участия: {ticket_number}")
+        outbound.enqueue(callback_query.message.answer(
+            f"Вы уже участвуете в лотерее.\nВаш номер {ticket_number}"))
 
     await state.clear()
     await callback_query.answer()
@@ -0,0 +1,124 @@
+"""
+Фаза запуска и проверки готовности бота.
+
+run_startup_checks открывает соединения пула заранее и проверяет доступность БД и Bot API,
+чтобы первый пользователь не ждал подключения. Результат виден на сервере метрик:
+    /health — процесс жив (всегда 200)
+    /ready  — 200, если запуск завершён и БД (и реплика, если настроена) отвечает, иначе 503
+"""
+import asyncio
+import time
+
+from aiogram import Bot
+from aiohttp import web
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+from models.database import engine, replica_engine
+
+from logs.logging_config import logger
+
+
+class Readiness:
+    """Результаты проверок запуска"""
+
+    def __init__(self):
+        self.started = False  # on_startup завершён, кэши прогреты
+        self.checks: dict[str, bool] = {"database": False, "bot_api": False}
+        if replica_engine is not None:
+            self.checks["replica"] = False
+        self.startup_seconds: float | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.started and all(self.checks.values())
+
+
+readiness = Readiness()
+
+
+async def _select_one(engine_: AsyncEngine = engine) -> None:
+    async with engine_.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def prewarm_pool(connections: int, timeout: float) -> int:
+    """
+    Открывает до connections соединений одновременно и возвращает их в пул,
+    где они остаются до DB_POOL_RECYCLE
+    :param connections: int:
+    :param timeout: сколько секунд ждать каждое соединение:
+    :return: сколько соединений удалось открыть:
+    """
+    results = await asyncio.gather(
+        *(asyncio.wait_for(_select_one(), timeout) for _ in range(connections)),
+        return_exceptions=True
+    )
+    return sum(not isinstance(result, BaseException) for result in results)
+
+
+async def check_database(timeout: float, engine_: AsyncEngine = engine) -> bool:
+    try:
+        await asyncio.wait_for(_select_one(engine_), timeout)
+        return True
+    except Exception as e:
+        logger.error(f"БД {engine_.url.host}/{engine_.url.database} недоступна: {e!r}")
+        return False
+
+
+async def check_bot_api(bot: Bot, timeout: float) -> bool:
+    """
+    Запрашивает getMe: проверяет токен и заодно открывает соединение с api.telegram.org
+    """
+    try:
+        me = await asyncio.wait_for(bot.get_me(), timeout)
+        logger.info(f"Bot API доступен, бот @{me.username}")
+        return True
+    except Exception as e:
+        logger.error(f"Bot API недоступен: {e!r}")
+        return False
+
+
+async def run_startup_checks(bot: Bot) -> None:
+    """
+    Прогревает пул и проверяет БД и Bot API. Ошибки не останавливают запуск:
+    бот продолжит работу, когда БД станет доступна, а /ready до тех пор отвечает 503
+    """
+    started = time.perf_counter()
+    connections = min(settings.STARTUP_PREWARM_CONNECTIONS, settings.DB_POOL_SIZE)
+    opened, readiness.checks["bot_api"] = await asyncio.gather(
+        prewarm_pool(connections, settings.HEALTH_CHECK_TIMEOUT),
+        check_bot_api(bot, settings.HEALTH_CHECK_TIMEOUT)
+    )
+    readiness.checks["database"] = opened > 0 or await check_database(settings.HEALTH_CHECK_TIMEOUT)
+    if replica_engine is not None:
+        readiness.checks["replica"] = await check_database(settings.HEALTH_CHECK_TIMEOUT, replica_engine)
+    logger.info(f"Пул соединений прогрет: {opened} из {connections} за {time.perf_counter() - started:.3f} с")
+
+
+def mark_started(started: float) -> None:
+    """
+    Отмечает окончание запуска
+    :param started: время начала запуска по time.perf_counter():
+    """
+    readiness.started = True
+    readiness.startup_seconds = time.perf_counter() - started
+    logger.info(f"Запуск завершён за {readiness.startup_seconds:.3f} с, готовность: {readiness.ready}")
+
+
+async def _handle_health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+async def _handle_ready(request: web.Request) -> web.Response:
+    # БД проверяется на каждый запрос: после запуска она могла стать недоступной
+    if readiness.started:
+        readiness.checks["database"] = await check_database(settings.HEALTH_CHECK_TIMEOUT)
+        if replica_engine is not None:
+            readiness.checks["replica"] = await check_database(settings.HEALTH_CHECK_TIMEOUT, replica_engine)
+    body = {"ready": readiness.ready, "started": readiness.started, **readiness.checks}
+    return web.json_response(body, status=200 if readiness.ready else 503)
+
+
+routes = [web.get("/health", _handle_health), web.get("/ready", _handle_ready)]
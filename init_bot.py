@@ -1,9 +1,20 @@
 from aiogram import Dispatcher, Bot, Router
+from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import settings
+from logs.logging_config import UpdateContextMiddleware
+from metrics.metrics import BotApiMetricsMiddleware
+from utils.fsm_storage import PostgresStorage
 
 
+if settings.FSM_STORAGE == "memory":
+    storage = MemoryStorage()
+else:
+    storage = PostgresStorage(ttl=settings.FSM_STATE_TTL, flush_delay=settings.FSM_FLUSH_DELAY)
+
 bot = Bot(token=settings.API_TELEGRAM_TOKEN)
-dp = Dispatcher()
+bot.session.middleware(BotApiMetricsMiddleware())  # Время запросов к Bot API, включая get_chat_member
+dp = Dispatcher(storage=storage)
+dp.update.outer_middleware(UpdateContextMiddleware())  # update_id и id пользователя во всех записях лога
 router = Router()
 dp.include_router(router)
@@ -0,0 +1,64 @@
+"""
+Запуск и остановка бота: on_startup и on_shutdown регистрируются в диспетчере главным
+процессом (run_bot) или каждым воркером (workers). Модуль не запускает бота при импорте,
+поэтому воркеры импортируют его, а не run_bot.
+"""
+import time
+
+from config import settings
+from init_bot import dp, bot
+
+from logs.logging_config import logger
+from health.health import mark_started, routes as health_routes, run_startup_checks
+from metrics.metrics import CounterGroup, GaugeGroup, db_engines, start_metrics_server, stop_metrics_server
+from models.database import get_pool_stats
+from utils.lottery_cache import lottery_cache
+from utils.lottery_stats import lottery_stats
+from utils.notifications import email_notifier
+from utils.outbound import outbound
+from utils.user_write_buffer import user_write_buffer
+from utils.utils_for_db import reconcile_lottery_stats, warm_participants_index
+
+
+_metrics_registered = False
+
+
+def register_metrics() -> None:
+    """Регистрирует метрики пула, очереди исходящих и лотереи один раз за процесс"""
+    global _metrics_registered
+    if _metrics_registered:
+        return
+    GaugeGroup(
+        "bot_db_pool", "Пул соединений с БД",
+        lambda: {(name,): get_pool_stats(engine_) for name, engine_ in db_engines.items()}, ["engine"]
+    )
+    GaugeGroup("bot_outbound", "Очередь исходящих сообщений", outbound.metrics)
+    CounterGroup("bot_outbound", "Исходящие сообщения", outbound.counters)
+    GaugeGroup("bot_lottery", "Статистика текущей лотереи", lottery_stats.snapshot)
+    _metrics_registered = True
+
+
+async def on_startup():
+    started = time.perf_counter()
+    register_metrics()
+    if settings.METRICS_ENABLED:
+        # Сервер поднимается первым, чтобы /ready отвечал 503 всё время запуска
+        await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT, health_routes)
+    await run_startup_checks(bot)
+    await lottery_cache.warm(settings.LOTTERY_NAME)
+    await warm_participants_index(settings.LOTTERY_NAME)
+    lottery_stats.start(
+        lambda: reconcile_lottery_stats(settings.LOTTERY_NAME),
+        settings.LOTTERY_STATS_RECONCILE_INTERVAL
+    )
+    mark_started(started)
+
+
+async def on_shutdown():
+    await outbound.close()  # Дослать ответы, поставленные в очередь до остановки
+    await email_notifier.close()
+    await user_write_buffer.close()
+    await lottery_stats.close()
+    await dp.storage.close()  # Записать в БД накопленные изменения состояний FSM
+    await stop_metrics_server()
+    await logger.complete()  # Дождаться записи очереди логов
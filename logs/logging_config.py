@@ -1,15 +1,84 @@
+import logging
 import os
+import random
 import sys
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
 
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
 from loguru import logger
 
+from config import settings
+
 
 if not os.path.exists('logs'):
     os.makedirs('logs')
 
-logger.remove()
+# Обновление, которое обрабатывается в текущей задаче asyncio: по нему связываются все записи
+# одного обновления, включая записи из utils_for_db и aiogram
+update_context: ContextVar[tuple[Any, Any]] = ContextVar("update_context", default=("-", "-"))
+
+DEBUG_LEVEL_NO = logger.level("DEBUG").no
+
+
+def _add_update_context(record) -> None:
+    record["extra"]["update_id"], record["extra"]["user_id"] = update_context.get()
+
+
+def _sample_debug(record) -> bool:
+    """
+    Пропускает DEBUG и ниже только для доли LOG_DEBUG_SAMPLE_RATE обновлений.
+    Выбор зависит от update_id, поэтому записи выбранного обновления сохраняются целиком
+    """
+    if record["level"].no > DEBUG_LEVEL_NO or settings.LOG_DEBUG_SAMPLE_RATE >= 1:
+        return True
+    update_id = record["extra"]["update_id"]
+    if update_id == "-":
+        return random.random() < settings.LOG_DEBUG_SAMPLE_RATE
+    return update_id % 1000 < settings.LOG_DEBUG_SAMPLE_RATE * 1000
+
 
+class InterceptHandler(logging.Handler):
+    """Передаёт записи стандартного logging (aiogram, aiohttp) в loguru"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # Ищем кадр, из которого вызван logging, чтобы в записи было верное место вызова
+        frame, depth = logging.currentframe(), 2
+        while frame and frame.f_code.co_filename == logging.__file__:
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+class UpdateContextMiddleware(BaseMiddleware):
+    """Outer middleware Dispatcher.update: записывает update_id и id пользователя в update_context"""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        token = update_context.set((event.update_id, user.id if user else "-"))
+        try:
+            return await handler(event, data)
+        finally:
+            update_context.reset(token)
+
+
+logger.remove()
+logger.configure(patcher=_add_update_context)
 
-# Настройка логера
-logger.add("logs/app.log", level="INFO", rotation="10 MB", retention="10 days", compression="zip")
-logger.add(sys.stdout, level="DEBUG", format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}")
+# Настройка логера. enqueue=True: запись в файл и консоль выполняет отдельный поток,
+# цикл событий только кладёт готовую запись в очередь
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | upd={extra[update_id]} user={extra[user_id]} | {message}"
+logger.add("logs/app.log", level=settings.LOG_FILE_LEVEL, format=LOG_FORMAT, filter=_sample_debug,
+           serialize=settings.LOG_SERIALIZE, enqueue=True,
+           rotation="10 MB", retention="10 days", compression="zip")
+logger.add(sys.stdout, level=settings.LOG_LEVEL, format=LOG_FORMAT, filter=_sample_debug, enqueue=True)
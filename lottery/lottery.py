@@ -0,0 +1,36 @@
+"""
+Администрирование лотерей из командной строки.
+
+    python -m lottery.lottery create --name "Весна 2026" --description "Розыгрыш проектора"
+    python -m lottery.lottery detach --name "Осень 2025"              # секция уходит в схему archive
+    python -m lottery.lottery detach --name "Осень 2025" --archive-schema ""   # остаётся в public
+"""
+import argparse
+import sys
+
+from models.database import get_sync_sessionmaker
+from utils.utils_for_db import create_lottery, detach_ticket_partition
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Создание лотерей и архивирование их билетов")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create_parser = commands.add_parser("create", help="создать лотерею и секцию для её билетов")
+    create_parser.add_argument("--name", required=True)
+    create_parser.add_argument("--description", default="")
+    detach_parser = commands.add_parser("detach", help="отсоединить билеты завершённой лотереи от tickets")
+    detach_parser.add_argument("--name", required=True)
+    detach_parser.add_argument("--archive-schema", default="archive")
+    arguments = parser.parse_args()
+
+    with get_sync_sessionmaker()() as session:
+        if arguments.command == "create":
+            result = create_lottery(session, arguments.name, arguments.description)
+        else:
+            result = detach_ticket_partition(session, arguments.name, arguments.archive_schema or None)
+
+    if not result["success"]:
+        print(result["error"])
+        sys.exit(1)
+    print(f"Лотерея {result['lottery'].name} создана" if arguments.command == "create"
+          else f"Билеты перенесены в {result['table']}")
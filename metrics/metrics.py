@@ -0,0 +1,275 @@
+"""
+Метрики бота в текстовом формате Prometheus.
+
+Время обработчиков пишет HandlerMetricsMiddleware, запросы к Bot API — BotApiMetricsMiddleware
+сессии бота, SQL-запросы — события движков основной БД и реплики: каждый запрос относится
+к функции utils_for_db, отмеченной @track_db_operation, и к движку (метка engine). Сервер метрик запускается в on_startup:
+    curl localhost:9108/metrics
+"""
+import abc
+import bisect
+import functools
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiohttp import web
+from sqlalchemy import event
+
+from models.database import engine, replica_engine
+
+from logs.logging_config import logger
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry: list["Metric"] = []
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple, **extra: Any) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(labelnames, values), *extra.items())]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(abc.ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        if any(metric.name == name and metric.type == self.type for metric in _registry):
+            # Повторные # TYPE одной метрики Prometheus не принимает
+            raise ValueError(f"Метрика {name} уже зарегистрирована")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def collect(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self._samples()]
+
+    @abc.abstractmethod
+    def _samples(self) -> list[str]:
+        """Строки значений метрики без заголовков HELP и TYPE"""
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}  # метки -> [счётчики по корзинам, сумма, количество]
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le=bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class GaugeGroup(Metric):
+    """
+    Набор gauge из функции, возвращающей словарь чисел, например get_pool_stats.
+    Каждый ключ становится отдельной метрикой {prefix}_{ключ}.
+    С метками labelnames функция возвращает словарь {значения меток: словарь чисел}
+    """
+    type = "gauge"
+
+    def __init__(self, prefix: str, documentation: str, callback: Callable[[], dict], labelnames: Iterable[str] = ()):
+        super().__init__(prefix, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self) -> list[str]:
+        # У каждой метрики группы свои заголовки, они добавляются в _samples
+        return self._samples()
+
+    def _samples(self) -> list[str]:
+        values = self.callback()
+        samples: dict[str, list[str]] = {}
+        for labels, group in (values.items() if self.labelnames else [((), values)]):
+            for key, value in group.items():
+                samples.setdefault(key, []).append(
+                    f"{self._metric_name(key)}{_format_labels(self.labelnames, labels)} {value}"
+                )
+        lines = []
+        for key, metric_samples in samples.items():
+            name = self._metric_name(key)
+            lines += [f"# HELP {name} {self.documentation}: {key}", f"# TYPE {name} {self.type}", *metric_samples]
+        return lines
+
+    def _metric_name(self, key: str) -> str:
+        return f"{self.name}_{key}"
+
+
+class CounterGroup(GaugeGroup):
+    """
+    Набор counter из функции, возвращающей словарь растущих чисел.
+    Каждый ключ становится отдельной метрикой {prefix}_{ключ}_total
+    """
+    type = "counter"
+
+    def _metric_name(self, key: str) -> str:
+        return f"{self.name}_{key}_total"
+
+
+handler_duration = Histogram(
+    "bot_handler_duration_seconds", "Время работы обработчика обновления", ["handler", "status"]
+)
+db_query_duration = Histogram(
+    "bot_db_query_duration_seconds", "Время выполнения SQL-запроса по функциям utils_for_db",
+    ["engine", "operation"]
+)
+bot_api_duration = Histogram(
+    "bot_api_request_duration_seconds", "Время запроса к Bot API", ["method", "status"]
+)
+tickets_issued = Counter("bot_tickets_issued_total", "Выдано новых билетов")
+callbacks_coalesced = Counter(
+    "bot_callbacks_coalesced_total", "Повторные нажатия кнопки, пока первое ещё обрабатывается", ["data"]
+)
+
+# Функция utils_for_db, которая сейчас выполняет запросы в этой задаче asyncio.
+# SQLAlchemy выполняет синхронную часть в greenlet с контекстом вызвавшей задачи,
+# поэтому значение видно в обработчиках событий движка
+db_operation: ContextVar[str] = ContextVar("db_operation", default="other")
+
+# Движки по значению метки engine: запросы и пулы реплики учитываются отдельно от основной БД
+db_engines = {"primary": engine}
+if replica_engine is not None:
+    db_engines["replica"] = replica_engine
+
+
+def track_db_operation(func):
+    """Относит SQL-запросы, выполненные внутри функции, к её имени"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = db_operation.set(func.__name__)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            db_operation.reset(token)
+    return wrapper
+
+
+def _instrument_engine(engine_name: str, sync_engine) -> None:
+    """Подписывается на события движка и пишет время запросов с меткой engine"""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_query_duration.observe(
+            time.perf_counter() - conn.info["query_started"].pop(), engine=engine_name, operation=db_operation.get()
+        )
+
+    def handle_error(exception_context):
+        # after_cursor_execute не вызывается при ошибке, время начала нужно убрать
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+
+
+for _engine_name, _engine in db_engines.items():
+    _instrument_engine(_engine_name, _engine.sync_engine)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время каждого запроса к Bot API по методам"""
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await make_request(bot, method)
+            status = "ok"
+            return response
+        finally:
+            bot_api_duration.observe(time.perf_counter() - started, method=type(method).__name__, status=status)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        try:
+            lines += metric.collect()
+        except Exception as e:
+            logger.error(f"Ошибка сбора метрики {metric.name}: {e}")
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+_runner: web.AppRunner | None = None
+
+
+async def start_metrics_server(host: str, port: int, routes: Iterable[web.RouteDef] = ()) -> None:
+    """
+    Запускает HTTP-сервер с /metrics и дополнительными маршрутами routes
+    (проверки готовности из health)
+    """
+    global _runner
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    app.router.add_routes(routes)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, host, port).start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+
+
+async def stop_metrics_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -1,8 +1,15 @@
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, Message, TelegramObject
 
 from config import settings
-from init_bot import bot
+from metrics.metrics import callbacks_coalesced, handler_duration
+from models.database import AsyncSession
+from utils.membership_cache import membership_cache
+from utils.outbound import outbound
 from utils.utils_for_db import is_exists_user
 
 
@@ -10,12 +17,11 @@ def check_subscribe(func):
     """Checking user subscribing on the group or channel"""
     async def wrapper(message: Message):
         user_id = message.from_user.id
-        status = await bot.get_chat_member(chat_id=settings.CHANNEL_ID_MIRAN, user_id=user_id)
-        if status.status in ('member', 'creator', 'administrator'):
+        if await membership_cache.is_subscribed(user_id):
             await func(message)
         else:
-            await message.answer(f"""Вы не зарегистрированы!\n
-            Для регистрации перейдите по ссылке: {settings.CHANNEL_LINK_REG_BOT}""")
+            outbound.enqueue(message.answer(f"""Вы не зарегистрированы!\n
+            Для регистрации перейдите по ссылке: {settings.CHANNEL_LINK_REG_BOT}"""))
     return wrapper
 
 
@@ -24,7 +30,7 @@ def check_registration(func):
     async def wrapper(message: Message, state: FSMContext):
         user_id = message.from_user.id
         if await is_exists_user(telegram_id=user_id):
-            await message.answer(f"""Упс!\nВы уже зарегистрированы.""")
+            outbound.enqueue(message.answer(f"""Упс!\nВы уже зарегистрированы."""))
         else:
             await func(message, state)
     return wrapper
@@ -34,10 +40,84 @@ def is_exists_user_in_channel_and_table(func):
     """Checking user subscribing on the group or channel"""
     async def wrapper(message: Message):
         user_id = message.from_user.id
-        status = await bot.get_chat_member(chat_id=settings.CHANNEL_ID_MIRAN, user_id=user_id)
-        if status.status in ('member', 'creator', 'administrator') and await is_exists_user(telegram_id=user_id):
-            await message.answer(f"""Вы уже зарегистрированы.""")
+        if await membership_cache.is_subscribed(user_id) and await is_exists_user(telegram_id=user_id):
+            outbound.enqueue(message.answer(f"""Вы уже зарегистрированы."""))
         else:
             await func(message)
 
     return wrapper
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Открывает одну сессию БД на обновление и передаёт её обработчику в параметре session.
+    Соединение из пула берётся только при первом запросе и возвращается после обработки обновления.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        async with AsyncSession() as session:
+            data["session"] = session
+            return await handler(event, data)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Записывает время работы обработчика в гистограмму bot_handler_duration_seconds.
+    Регистрируется как внутренняя middleware, поэтому знает, какой обработчик выбран фильтрами.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object is not None else "unknown"
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await handler(event, data)
+            status = "ok"
+            return result
+        finally:
+            handler_duration.observe(time.perf_counter() - started, handler=name, status=status)
+
+
+# callback data кнопок из keyboards: клиент может прислать любую строку,
+# поэтому в метку метрики попадают только они, остальное считается как "other"
+KNOWN_CALLBACKS = frozenset({
+    "waiting_for_consent", "yes", "no", "check_user_state", "get_number_of_ticket"
+})
+
+
+class CallbackCoalescingMiddleware(BaseMiddleware):
+    """
+    Пропускает только одно нажатие кнопки на пару (пользователь, callback data) за раз.
+    Повторные нажатия, пришедшие, пока первое обрабатывается (двойной тап по «Получить номер»),
+    сразу закрываются пустым answer() и не повторяют запросы к БД и Bot API.
+    Регистрируется первой outer middleware callback_query, чтобы дубликат не брал сессию БД.
+    """
+    def __init__(self):
+        self._in_flight: set[tuple[int, str | None]] = set()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: CallbackQuery,
+            data: dict[str, Any]
+    ) -> Any:
+        key = (event.from_user.id, event.data)
+        if key in self._in_flight:
+            callbacks_coalesced.inc(data=event.data if event.data in KNOWN_CALLBACKS else "other")
+            await event.answer()  # Убирает «часики» на кнопке
+            return None
+
+        self._in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
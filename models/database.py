@@ -1,25 +1,203 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy import create_engine
+import time
+from contextlib import asynccontextmanager
+from collections.abc import Hashable
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy import URL, create_engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import Settings, settings
+
+
+class PoolStats:
+    """Статистика ожидания соединений из пула"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Пул соединений, который замеряет время ожидания свободного соединения"""
 
-from models.config_params_to_db import get_configuration_psql_db
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
 
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.record_wait(time.perf_counter() - started)
 
-user, password, host, port, dbname = get_configuration_psql_db().values()
 
-# Создание асинхронного движка для PostgreSQL
-DATABASE_URL_ASYNC = f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{dbname}"
+def has_replica(config: Settings) -> bool:
+    return bool(config.DB_REPLICA_HOST_PSQL or config.DB_REPLICA_DATABASE_PSQL)
 
-engine = create_async_engine(DATABASE_URL_ASYNC, echo=True)  # асинхронный
-# Если echo=True, то все SQL-запросы, которые выполняются, будут выводиться в консоль.
-# Это полезно для отладки, чтобы видеть, какие запросы отправляются в базу данных
 
-AsyncSession = sessionmaker(bind=engine, class_=AsyncSession)
+def build_database_url(
+        config: Settings,
+        drivername: str = "postgresql+asyncpg",
+        replica: bool = False,
+        **query: str
+) -> URL:
+    """
+    :param replica: адрес реплики; незаданные параметры реплики берутся из основной БД:
+    """
+    return URL.create(
+        drivername=drivername,
+        username=config.DB_USER_PSQL,
+        password=config.DB_PASSWORD_PSQL.get_secret_value(),
+        host=replica and config.DB_REPLICA_HOST_PSQL or config.DB_HOST_PSQL,
+        port=replica and config.DB_REPLICA_PORT_PSQL or config.DB_PORT_PSQL,
+        database=replica and config.DB_REPLICA_DATABASE_PSQL or config.DB_DATABASE_PSQL,
+        query=query
+    )
+
+
+def create_engine_from_settings(config: Settings, replica: bool = False) -> AsyncEngine:
+    """
+    Создаёт асинхронный движок PostgreSQL с параметрами пула из настроек
+    :param config: Settings:
+    :param replica: движок реплики только для чтения:
+    :return: AsyncEngine:
+    """
+    return create_async_engine(
+        build_database_url(
+            config,
+            replica=replica,
+            prepared_statement_cache_size=str(config.DB_STATEMENT_CACHE_SIZE)
+        ),
+        echo=config.DB_ECHO,  # Если echo=True, то все SQL-запросы будут выводиться в консоль
+        poolclass=InstrumentedAsyncPool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING
+    )
+
+
+engine = create_engine_from_settings(settings)  # асинхронный
+# Реплика для чтения или None, если она не настроена
+replica_engine = create_engine_from_settings(settings, replica=True) if has_replica(settings) else None
+
+DbSession = AsyncSession  # Класс сессии для аннотаций: имя AsyncSession ниже занимает фабрика сессий
+
+AsyncSession = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 # class_=AsyncSession — указывает, что создаваемые сессии должны быть асинхронными:
 # AsyncSession — это асинхронная версия Session в SQLAlchemy, которая позволяет использовать await
 # для асинхронного выполнения запросов.
+# expire_on_commit=False — объекты остаются доступны после commit() без повторной загрузки,
+# это важно, когда одна сессия обслуживает несколько запросов за обновление.
+
+ReadAsyncSession = sessionmaker(bind=replica_engine or engine, class_=DbSession, expire_on_commit=False)
+
+
+class ReadYourWrites:
+    """
+    Помнит, кто недавно записывал в основную БД. Пока не прошло window секунд, данные
+    этого пользователя читаются из основной БД: реплика могла ещё не получить запись.
+    Обновления одного пользователя обрабатывает один процесс (см. workers), поэтому
+    состояния внутри процесса достаточно.
+    """
+
+    def __init__(self, window: float, max_size: int = 100000):
+        self.window = window
+        self.max_size = max_size
+        self._writes: dict[Hashable, float] = {}  # ключ -> до какого времени читать из основной БД
+
+    def mark(self, key: Hashable) -> None:
+        if len(self._writes) >= self.max_size:
+            now = time.monotonic()
+            self._writes = {k: until for k, until in self._writes.items() if until > now}
+        self._writes[key] = time.monotonic() + self.window
+
+    def is_recent(self, key: Hashable) -> bool:
+        until = self._writes.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._writes[key]
+            return False
+        return True
+
+
+read_your_writes = ReadYourWrites(window=settings.READ_YOUR_WRITES_WINDOW)
+
+
+@asynccontextmanager
+async def get_session(session: DbSession | None = None):
+    """
+    Отдаёт сессию текущего обновления, а если её нет — открывает отдельную сессию
+    :param session: DbSession или None:
+    :return: DbSession:
+    """
+    if session is None:
+        async with AsyncSession() as new_session:
+            yield new_session
+        return
+
+    try:
+        yield session
+    except SQLAlchemyError:
+        # Общую сессию после ошибки нужно откатить, иначе следующие запросы обновления упадут
+        await session.rollback()
+        raise
+
+
+@asynccontextmanager
+async def get_read_session(session: DbSession | None = None, key: Hashable | None = None):
+    """
+    Сессия для запросов только на чтение: реплика, если она настроена и по ключу key
+    (обычно telegram_id) не было записи за последние READ_YOUR_WRITES_WINDOW секунд,
+    иначе — как get_session
+    :param session: DbSession или None:
+    :param key: чьи данные читаются, None — данные не привязаны к пользователю:
+    :return: DbSession:
+    """
+    if replica_engine is None or (key is not None and read_your_writes.is_recent(key)):
+        async with get_session(session) as primary_session:
+            yield primary_session
+        return
+
+    async with ReadAsyncSession() as replica_session:
+        yield replica_session
+
+
+def get_pool_stats(engine_: AsyncEngine = engine) -> dict:
+    """
+    Возвращает текущее состояние пула соединений асинхронного движка
+    :param engine_: AsyncEngine, по умолчанию основная БД:
+    :return: dict:
+    """
+    pool = engine_.sync_engine.pool
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),  # overflow() отрицателен, пока пул не заполнен
+        "checkouts": stats.checkouts,
+        "checkout_wait_total": stats.wait_total,
+        "checkout_wait_max": stats.wait_max,
+    }
+
 
-# Создание синхронного движка
-DATABASE_URL = f"postgresql://{user}:{password}@{host}:{port}/{dbname}"
-engine_local = create_engine(DATABASE_URL, echo=True)  # синхронный движок
-SessionLocal = sessionmaker(bind=engine_local, autocommit=False)
+@lru_cache
+def get_sync_sessionmaker() -> sessionmaker:
+    """
+    Синхронные сессии нужны только скриптам администрирования (например, create_lottery),
+    поэтому движок psycopg2 создаётся при первом обращении, а не при импорте модуля
+    """
+    engine_local = create_engine(build_database_url(settings, drivername="postgresql"), echo=settings.DB_ECHO)
+    return sessionmaker(bind=engine_local, autocommit=False)
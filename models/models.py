@@ -2,15 +2,19 @@ from datetime import datetime
 
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import (
+    DDL,
     Column,
     Integer,
     String,
     BigInteger,
     DateTime,
     ForeignKey,
+    Index,
     UniqueConstraint,
-    Boolean
+    Boolean,
+    event
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -44,14 +48,33 @@ class Lottery(Base):
     # Связь с Ticket
     tickets = relationship("Ticket", back_populates="lottery")
 
+    __table_args__ = (
+        # Покрывающий индекс: поиск id по названию выполняется без обращения к таблице
+        Index('ix_lotteries_name_id', 'name', postgresql_include=['id']),
+    )
+
+
+TICKET_PARTITION_PREFIX = "tickets_lottery_"  # Секция билетов лотереи: tickets_lottery_<id лотереи>
+TICKET_DEFAULT_PARTITION = "tickets_default"  # Билеты лотерей, для которых секция не создана
+
+
+def ticket_partition_name(lottery_id: int) -> str:
+    return f"{TICKET_PARTITION_PREFIX}{int(lottery_id)}"
+
 
 class Ticket(Base):
+    """
+    Таблица секционирована по lottery_id (PARTITION BY LIST): у каждой лотереи своя секция,
+    которую create_lottery создаёт вместе с лотереей. Запросы с lottery_id читают только её,
+    а завершённую лотерею можно отсоединить (detach_ticket_partition) вместе с билетами.
+    """
     __tablename__ = "tickets"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    # Ключ секционирования обязан входить в первичный ключ
+    id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)
     ticket_number = Column(Integer, nullable=False)  # Номер билета
     create = Column(DateTime, default=datetime.utcnow)  # Дата выдачи билета
-    lottery_id = Column(BigInteger, ForeignKey('lotteries.id'))  # Ссылка на лотерею
+    lottery_id = Column(BigInteger, ForeignKey('lotteries.id'), primary_key=True, autoincrement=False)  # Ссылка на лотерею
     user_id = Column(BigInteger, ForeignKey('users.id'))  # Ссылка на пользователя
 
     lottery = relationship("Lottery", back_populates="tickets")
@@ -59,4 +82,57 @@ class Ticket(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'lottery_id', name='unique_ticket_per_lottery'),
+        # Номер билета уникален в лотерее. Тот же индекс отдаёт номера по порядку:
+        # максимум номера, выгрузка и розыгрыш
+        Index('ix_tickets_lottery_id_ticket_number', 'lottery_id', 'ticket_number',
+              unique=True, postgresql_include=['user_id']),
+        # Участники лотереи по порядку user_id: рассылка и проверка билета по лотерее
+        Index('ix_tickets_lottery_id_user_id', 'lottery_id', 'user_id'),
+        {"postgresql_partition_by": "LIST (lottery_id)"},
     )
+
+
+# Без секции по умолчанию вставка билета лотереи, у которой нет своей секции, завершится ошибкой
+event.listen(
+    Ticket.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE IF NOT EXISTS {TICKET_DEFAULT_PARTITION} PARTITION OF tickets DEFAULT")
+)
+
+
+class TicketCounter(Base):
+    __tablename__ = "ticket_counters"
+
+    lottery_id = Column(BigInteger, ForeignKey('lotteries.id'), primary_key=True)  # Ссылка на лотерею
+    last_number = Column(Integer, nullable=False)  # Последний зарезервированный номер билета
+
+
+class FsmState(Base):
+    __tablename__ = "fsm_states"
+
+    key = Column(String, primary_key=True)  # Ключ FSM: бот, чат, пользователь
+    state = Column(String, nullable=True)  # Текущее состояние, например Registration:last_name
+    data = Column(JSONB, nullable=False, default=dict)  # Данные, накопленные в state.update_data
+    updated = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # Время последнего изменения
+
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    lottery_id = Column(BigInteger, ForeignKey('lotteries.id'))  # Рассылка участникам этой лотереи
+    text = Column(String, nullable=False)  # Текст сообщения
+    status = Column(String, default='new', nullable=False)  # new, running, done
+    dry_run = Column(Boolean, default=False, nullable=False)  # Пробная рассылка без отправки в Telegram
+    last_user_id = Column(BigInteger, default=0, nullable=False)  # users.id последнего обработанного получателя
+    create = Column(DateTime, default=datetime.utcnow)
+
+
+class BroadcastDelivery(Base):
+    __tablename__ = "broadcast_deliveries"
+
+    broadcast_id = Column(BigInteger, ForeignKey('broadcasts.id'), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey('users.id'), primary_key=True)
+    status = Column(String, nullable=False)  # sent, blocked, failed
+    error = Column(String, default='')  # Ответ Bot API при ошибке
+    create = Column(DateTime, default=datetime.utcnow)
@@ -1,19 +1,34 @@
 import asyncio
 import logging
-import sys
 
+from config import settings
 from init_bot import dp, bot
 
-from logs.logging_config import logger
+from logs.logging_config import InterceptHandler, logger
 from handlers import handlers
+from lifecycle.lifecycle import on_shutdown, on_startup
+from webhook.webhook import run_webhook
+from workers.workers import run_workers
 
 
 async def main():
-    await dp.start_polling(bot)
+    if settings.WORKERS > 1:
+        await run_workers(dp, bot, settings.WORKERS)
+        return
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    if settings.BOT_MODE == "webhook":
+        await run_webhook(dp, bot)
+        return
+
+    # chat_member не входит в обновления по умолчанию, его нужно запросить явно
+    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
 
 if __name__ == '__main__':
     try:
-        logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+        # Логи aiogram и aiohttp идут через ту же очередь loguru, а не пишутся в консоль синхронно
+        logging.basicConfig(handlers=[InterceptHandler()], level=logging.INFO, force=True)
         asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Выход")
@@ -0,0 +1,56 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import GetChatMember, GetMe, SendMessage, TelegramMethod
+from aiogram.types import Chat, ChatMemberLeft, ChatMemberMember, Message, User
+
+
+class FakeSession(BaseSession):
+    """
+    Сессия Bot API без сети: на каждый запрос отвечает правдоподобной заглушкой.
+    Нужна для пробной рассылки (dry run) и нагрузочных тестов обработчиков.
+    """
+
+    def __init__(self, member_status: str = "member", latency: float = 0.0, blocked_chat_ids=()):
+        super().__init__()
+        self.member_status = member_status  # Статус пользователя в канале для get_chat_member
+        self.latency = latency  # Имитация задержки сети в секундах
+        self.blocked_chat_ids = set(blocked_chat_ids)  # Чаты, в которых бот «заблокирован»
+        self.requests: Counter = Counter()  # Количество запросов по методам Bot API
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None) -> Any:
+        self.requests[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, SendMessage):
+            if method.chat_id in self.blocked_chat_ids:
+                raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+            self._message_id += 1
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text
+            )
+        if isinstance(method, GetChatMember):
+            user = User(id=method.user_id, is_bot=False, first_name="Test")
+            if self.member_status == "member":
+                return ChatMemberMember(user=user)
+            return ChatMemberLeft(user=user)
+        if isinstance(method, GetMe):
+            return User(id=bot.id, is_bot=True, first_name="Bot")
+        return True
+
+    async def stream_content(self, url: str, headers: dict | None = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,161 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.future import select
+
+from models.database import AsyncSession
+from models.models import FsmState
+
+from logs.logging_config import logger
+
+
+@dataclass
+class _Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    updated: datetime = field(default_factory=datetime.utcnow)
+
+
+class PostgresStorage(BaseStorage):
+    """
+    Хранилище FSM aiogram в таблице fsm_states.
+
+    Состояние и данные пользователя держатся в памяти процесса и записываются в БД
+    отложенно: изменения, сделанные в течение flush_delay секунд (например, update_data и
+    set_state одного обработчика), сохраняются одним запросом вместе с изменениями других
+    пользователей. Состояния, которые не менялись дольше ttl секунд, считаются брошенными
+    и удаляются. Кэш в памяти корректен, пока обновления одного пользователя обрабатывает
+    один процесс бота.
+    """
+
+    def __init__(self, ttl: float, flush_delay: float):
+        self.ttl = timedelta(seconds=ttl)
+        self.flush_delay = flush_delay
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True)
+        self._records: dict[str, _Record] = {}
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()  # Записи одного ключа не должны обгонять друг друга
+        self._last_cleanup = datetime.utcnow()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        name, record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._touch(name, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        _, record = await self._get_record(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        name, record = await self._get_record(key)
+        record.data = data.copy()
+        self._touch(name, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, record = await self._get_record(key)
+        return record.data.copy()
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Записывает в БД все накопленные изменения одним запросом и удаляет устаревшие состояния
+        """
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        names, self._dirty = self._dirty, set()
+        upserts = []
+        deletes = []
+        for name in names:
+            record = self._records.get(name)
+            if record is None:
+                continue
+            if record.state is None and not record.data:
+                deletes.append(name)  # state.clear(): строка больше не нужна
+            else:
+                upserts.append({"key": name, "state": record.state, "data": record.data, "updated": record.updated})
+
+        now = datetime.utcnow()
+        need_cleanup = now - self._last_cleanup > self.ttl / 24
+        if not upserts and not deletes and not need_cleanup:
+            return
+
+        try:
+            async with AsyncSession() as session:
+                if upserts:
+                    query_upsert = insert(FsmState).values(upserts)
+                    query_upsert = query_upsert.on_conflict_do_update(
+                        index_elements=[FsmState.key],
+                        set_={
+                            "state": query_upsert.excluded.state,
+                            "data": query_upsert.excluded.data,
+                            "updated": query_upsert.excluded.updated
+                        }
+                    )
+                    await session.execute(query_upsert)
+                if deletes:
+                    await session.execute(delete(FsmState).where(FsmState.key.in_(deletes)))
+                if need_cleanup:
+                    await session.execute(delete(FsmState).where(FsmState.updated < now - self.ttl))
+                await session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка записи состояний FSM в БД, повтор при следующем изменении: {e}")
+            self._dirty |= names
+            return
+
+        for name in deletes:
+            record = self._records.get(name)
+            if record is not None and record.state is None and not record.data and name not in self._dirty:
+                del self._records[name]
+        if need_cleanup:
+            self._last_cleanup = now
+            for name, record in list(self._records.items()):
+                if record.updated < now - self.ttl and name not in self._dirty:
+                    del self._records[name]
+
+    async def _get_record(self, key: StorageKey) -> tuple[str, _Record]:
+        name = self.key_builder.build(key)
+        record = self._records.get(name)
+        if record is None:
+            loaded = await self._load(name)
+            # Пока шёл запрос, запись мог создать параллельный обработчик
+            record = self._records.setdefault(name, loaded)
+        elif record.updated < datetime.utcnow() - self.ttl:
+            record.state = None
+            record.data = {}
+        return name, record
+
+    async def _load(self, name: str) -> _Record:
+        async with AsyncSession() as session:
+            query = select(FsmState.state, FsmState.data, FsmState.updated).where(
+                FsmState.key == name,
+                FsmState.updated >= datetime.utcnow() - self.ttl
+            )
+            row = (await session.execute(query)).first()
+        if row is None:
+            return _Record()
+        return _Record(state=row.state, data=dict(row.data), updated=row.updated)
+
+    def _touch(self, name: str, record: _Record) -> None:
+        record.updated = datetime.utcnow()
+        self._dirty.add(name)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        self._flush_task = None
+        await self.flush()
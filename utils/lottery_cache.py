@@ -0,0 +1,87 @@
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+
+from config import settings
+from utils.utils_for_db import get_lottery_by_name
+
+from logs.logging_config import logger
+
+
+@dataclass(frozen=True)
+class LotterySnapshot:
+    """Неизменяемая копия строки Lottery, не привязанная к сессии"""
+    id: int
+    name: str
+    description: str
+    create: datetime
+
+
+class LotteryCache:
+    """
+    Кэш лотерей по имени внутри процесса.
+
+    Лотерея перечитывается из БД после ttl секунд или явным вызовом reload.
+    Отсутствующая лотерея не кэшируется, чтобы созданную позже лотерею было видно сразу.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[LotterySnapshot, float]] = {}  # name -> (лотерея, истекает)
+        self._locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def get(self, name: str) -> LotterySnapshot | None:
+        """
+        Возвращает лотерею из кэша, при необходимости загружая её из БД
+        :param name: str:
+        :return: LotterySnapshot или None:
+        """
+        entry = self._entries.get(name)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        async with self._locks[name]:
+            # Пока ждали блокировку, лотерею мог загрузить другой запрос
+            entry = self._entries.get(name)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            return await self._load(name)
+
+    async def reload(self, name: str) -> LotterySnapshot | None:
+        """
+        Перечитывает лотерею из БД независимо от ttl
+        :param name: str:
+        :return: LotterySnapshot или None:
+        """
+        async with self._locks[name]:
+            return await self._load(name)
+
+    async def warm(self, *names: str) -> None:
+        """
+        Загружает лотереи в кэш при запуске бота
+        :param names: str:
+        :return: None:
+        """
+        for name in names:
+            if await self.reload(name) is None:
+                logger.warning(f"Лотерея {name} не найдена при прогреве кэша.")
+
+    async def _load(self, name: str) -> LotterySnapshot | None:
+        lottery = await get_lottery_by_name(lottery_name=name)
+        if lottery is None:
+            self._entries.pop(name, None)
+            return None
+
+        snapshot = LotterySnapshot(
+            id=lottery.id,
+            name=lottery.name,
+            description=lottery.description,
+            create=lottery.create
+        )
+        self._entries[name] = (snapshot, time.monotonic() + self.ttl)
+        return snapshot
+
+
+lottery_cache = LotteryCache(ttl=settings.LOTTERY_CACHE_TTL)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from logs.logging_config import logger
+
+
+RATE_WINDOW = 60  # За сколько последних секунд считается скорость выдачи билетов
+
+
+class LotteryStats:
+    """
+    Счётчики текущей лотереи в памяти: выдано билетов, зарегистрировано пользователей,
+    последний номер билета и скорость выдачи за последнюю минуту.
+
+    Счётчики увеличиваются в момент выдачи билета и регистрации, поэтому ответ на /stats
+    не обращается к БД. Периодическая сверка с БД исправляет расхождения: записи других
+    процессов бота (WORKERS > 1), билеты, выданные до запуска, и записи в обход бота.
+    Билеты, найденные сверкой, добавляются в скорость выдачи текущей секунды.
+    Пользователи не привязаны к лотерее, поэтому registrations — все пользователи в БД.
+    """
+
+    def __init__(self):
+        self.lottery_name: str | None = None
+        self.tickets = 0
+        self.registrations = 0
+        self.last_ticket_number: int | None = None
+        self.reconciled: datetime | None = None  # Время последней успешной сверки с БД
+        self._buckets = [0] * RATE_WINDOW  # Выдано билетов по секундам, кольцевой буфер
+        self._bucket_seconds = [0] * RATE_WINDOW  # Какой секунде соответствует ячейка
+        self._task: asyncio.Task | None = None
+
+    def add_ticket(self, lottery_name: str, ticket_number: int, count: int = 1) -> None:
+        if lottery_name != self.lottery_name:
+            return
+        self.tickets += count
+        if self.last_ticket_number is None or ticket_number > self.last_ticket_number:
+            self.last_ticket_number = ticket_number
+        self._count_issued(count)
+
+    def add_registration(self, count: int = 1) -> None:
+        self.registrations += count
+
+    def rate_per_minute(self) -> int:
+        """Сколько билетов выдано за последние RATE_WINDOW секунд"""
+        now = int(time.monotonic())
+        return sum(
+            count for count, second in zip(self._buckets, self._bucket_seconds)
+            if now - second < RATE_WINDOW
+        )
+
+    def reconcile(self, lottery_name: str, tickets: int, last_ticket_number: int | None, registrations: int) -> None:
+        """
+        Заменяет счётчики значениями из БД
+        :param lottery_name: str:
+        :param tickets: количество билетов лотереи:
+        :param last_ticket_number: наибольший номер билета или None, если билетов нет:
+        :param registrations: количество пользователей:
+        :return: None:
+        """
+        if lottery_name == self.lottery_name and tickets > self.tickets:
+            self._count_issued(tickets - self.tickets)
+        self.lottery_name = lottery_name
+        self.tickets = tickets
+        self.last_ticket_number = last_ticket_number
+        self.registrations = registrations
+        self.reconciled = datetime.now()
+
+    def snapshot(self) -> dict:
+        return {
+            "tickets": self.tickets,
+            "registrations": self.registrations,
+            "rate_per_minute": self.rate_per_minute(),
+            "last_ticket_number": self.last_ticket_number or 0,
+        }
+
+    def start(self, reconcile: Callable[[], Awaitable], interval: float) -> None:
+        """
+        Запускает сверку: сразу и затем каждые interval секунд
+        :param reconcile: корутинная функция, загружающая значения из БД через reconcile():
+        :param interval: float:
+        :return: None:
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(reconcile, interval))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, reconcile: Callable[[], Awaitable], interval: float) -> None:
+        while True:
+            try:
+                await reconcile()
+            except Exception as e:
+                logger.exception(f"Ошибка сверки статистики лотереи: {e}")
+            await asyncio.sleep(interval)
+
+    def _count_issued(self, count: int) -> None:
+        now = int(time.monotonic())
+        index = now % RATE_WINDOW
+        if self._bucket_seconds[index] != now:
+            self._bucket_seconds[index] = now
+            self._buckets[index] = 0
+        self._buckets[index] += count
+
+
+lottery_stats = LotteryStats()
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from aiogram import Bot
+
+from config import settings
+from init_bot import bot
+
+
+SUBSCRIBED_STATUSES = ('member', 'creator', 'administrator')
+
+
+class MembershipCache:
+    """
+    Кэш статусов подписки пользователей на канал (результатов bot.get_chat_member).
+
+    Подписанные пользователи хранятся positive_ttl секунд, неподписанные — negative_ttl,
+    чтобы только что подписавшийся пользователь быстро прошёл проверку. Размер кэша
+    ограничен max_size, при переполнении вытесняются давно не использованные записи.
+    Одновременные запросы статуса одного пользователя объединяются в один вызов Bot API.
+    """
+
+    def __init__(self, bot: Bot, chat_id: str, positive_ttl: float, negative_ttl: float, max_size: int):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[int, tuple[str, float]] = OrderedDict()  # user_id -> (статус, истекает)
+        self._in_flight: dict[int, asyncio.Task] = {}
+
+    async def get_status(self, user_id: int) -> str:
+        """
+        Возвращает статус пользователя в канале из кэша или из Bot API
+        :param user_id: int:
+        :return: status: str:
+        """
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            status, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                return status
+            del self._entries[user_id]
+
+        task = self._in_flight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(user_id))
+            self._in_flight[user_id] = task
+        # shield: отмена одного ожидающего не должна отменять запрос для остальных
+        return await asyncio.shield(task)
+
+    async def is_subscribed(self, user_id: int) -> bool:
+        """
+        Проверяет подписку пользователя на канал
+        :param user_id: int:
+        :return: bool:
+        """
+        return await self.get_status(user_id) in SUBSCRIBED_STATUSES
+
+    def set_status(self, user_id: int, status: str) -> None:
+        """
+        Сохраняет известный статус пользователя, например из обновления chat_member
+        :param user_id: int:
+        :param status: str:
+        :return: None:
+        """
+        ttl = self.positive_ttl if status in SUBSCRIBED_STATUSES else self.negative_ttl
+        self._entries[user_id] = (status, time.monotonic() + ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Удаляет статус пользователя из кэша
+        :param user_id: int:
+        :return: None:
+        """
+        self._entries.pop(user_id, None)
+        self._in_flight.pop(user_id, None)
+
+    async def _fetch(self, user_id: int) -> str:
+        try:
+            member = await self.bot.get_chat_member(
+                chat_id=self.chat_id,
+                user_id=user_id,
+                request_timeout=10
+            )
+            # Результат запроса, начатого до invalidate, уже мог устареть
+            if self._in_flight.get(user_id) is asyncio.current_task():
+                self.set_status(user_id, member.status)
+            return member.status
+        finally:
+            if self._in_flight.get(user_id) is asyncio.current_task():
+                del self._in_flight[user_id]
+
+
+membership_cache = MembershipCache(
+    bot=bot,
+    chat_id=settings.CHANNEL_ID_MIRAN,
+    positive_ttl=settings.MEMBERSHIP_CACHE_POSITIVE_TTL,
+    negative_ttl=settings.MEMBERSHIP_CACHE_NEGATIVE_TTL,
+    max_size=settings.MEMBERSHIP_CACHE_MAX_SIZE
+)
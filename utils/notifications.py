@@ -0,0 +1,135 @@
+import asyncio
+from email.message import EmailMessage
+
+import aiosmtplib
+
+from config import settings
+from utils.utils import build_registration_html
+
+from logs.logging_config import logger
+
+
+class EmailNotifier:
+    """
+    Фоновая отправка писем о регистрациях.
+
+    Обработчик только кладёт событие в очередь и не ждёт SMTP. Воркер держит одно
+    SMTP-соединение (STARTTLS и авторизация выполняются один раз) и переподключается,
+    если сервер его закрыл. При batch_size > 1 регистрации, накопленные за batch_interval
+    секунд (но не больше batch_size), уходят одним письмом-дайджестом.
+    """
+
+    def __init__(self, hostname: str, port: int, username: str, password: str, recipients: str,
+                 batch_size: int, batch_interval: float, queue_size: int, start_tls: bool = True):
+        self.hostname = hostname
+        self.port = port
+        self.start_tls = start_tls
+        self.username = username
+        self.password = password
+        self.recipients = recipients
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._smtp: aiosmtplib.SMTP | None = None
+
+    def notify_registration(self, telegram_id, full_name, full_name_from_tg, username) -> None:
+        """
+        Ставит уведомление о регистрации в очередь, не дожидаясь отправки
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker = asyncio.create_task(self._run())
+        try:
+            self._queue.put_nowait((telegram_id, full_name, full_name_from_tg, username))
+        except asyncio.QueueFull:
+            logger.error(f"Очередь писем переполнена, уведомление о регистрации {telegram_id} не отправлено.")
+
+    async def close(self, timeout: float = 10) -> None:
+        """
+        Отправляет оставшиеся уведомления (не дольше timeout секунд) и закрывает соединение
+        """
+        if self._worker is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Не отправлено уведомлений о регистрации: {self._queue.qsize()}")
+            self._worker.cancel()
+            self._worker = None
+        if self._smtp is not None and self._smtp.is_connected:
+            try:
+                await self._smtp.quit()
+            except aiosmtplib.SMTPException:
+                pass
+        self._smtp = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._send(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _send(self, batch: list[tuple]) -> None:
+        message = EmailMessage()
+        message["From"] = self.username
+        message["To"] = self.recipients
+        if len(batch) == 1:
+            message["Subject"] = "Новая регистрация в телеграм Канале"
+        else:
+            message["Subject"] = f"Новые регистрации в телеграм Канале: {len(batch)}"
+        message.set_content(build_registration_html(batch), subtype='html')
+
+        for attempt in range(2):
+            try:
+                smtp = await self._connect()
+                await smtp.send_message(message)
+                logger.info(f"Письмо о {len(batch)} регистрациях отправлено на адрес {self.recipients}!")
+                return
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, asyncio.TimeoutError) as e:
+                # Сервер закрыл простаивающее соединение: переподключаемся и пробуем ещё раз
+                self._smtp = None
+                if attempt:
+                    logger.error(f"Ошибка соединения с SMTP, письмо о {len(batch)} регистрациях не отправлено: {e}")
+            except Exception as e:
+                logger.exception(f"Ошибка при отправке письма: {str(e)}")
+                return
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(
+                hostname=self.hostname,
+                port=self.port,
+                start_tls=self.start_tls,
+                username=self.username,
+                password=self.password
+            )
+            await smtp.connect()  # STARTTLS и авторизация выполняются при подключении
+            self._smtp = smtp
+        return self._smtp
+
+
+email_notifier = EmailNotifier(
+    hostname=settings.SMTP_SERVER,
+    port=587,
+    username=settings.SENDER_EMAIL,
+    password=settings.PASSWORD,
+    recipients=settings.TO_EMAILS,
+    batch_size=settings.EMAIL_BATCH_SIZE,
+    batch_interval=settings.EMAIL_BATCH_INTERVAL,
+    queue_size=settings.EMAIL_QUEUE_SIZE
+)
@@ -0,0 +1,255 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+
+from config import settings
+from init_bot import bot
+
+from logs.logging_config import logger
+
+
+INTERACTIVE = 0  # Ответы пользователю на его действие
+BULK = 1  # Рассылки: уходят, только когда нет ответов пользователям
+
+
+class TokenBucket:
+    """Ограничение частоты: rate токенов в секунду, не больше capacity накопленных"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать до следующего токена (0 — токен есть)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+
+@dataclass
+class _Item:
+    priority: int
+    seq: int
+    method: TelegramMethod
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class OutboundScheduler:
+    """
+    Общая очередь исходящих запросов к Bot API.
+
+    Соблюдает общий лимит бота (rate в секунду) и лимит на чат (chat_rate в секунду,
+    до chat_burst подряд), сообщения одного чата отправляются по порядку и по одному.
+    Ответы пользователям (INTERACTIVE) всегда уходят раньше рассылок (BULK).
+    При 429 от Telegram отправка приостанавливается на retry_after и запрос повторяется.
+    """
+
+    def __init__(self, bot: Bot, rate: float, chat_rate: float, chat_burst: int):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._global = TokenBucket(rate, capacity=rate)
+        self._chat_buckets: dict[Any, TokenBucket] = {}
+        self._chat_queues: dict[Any, deque[_Item]] = {}  # Чаты, у которых есть неотправленные сообщения
+        self._ready: list[tuple[int, int, Any]] = []  # Куча (priority, seq, chat_id) чатов, готовых к отправке
+        self._seq = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._runner: asyncio.Task | None = None
+        self._deliveries: set[asyncio.Task] = set()  # Ссылки на отправки: цикл событий хранит задачи слабо
+        self._paused_until = 0.0
+        self._depth = {INTERACTIVE: 0, BULK: 0}
+        self.sent = 0
+        self.failed = 0
+        self.retry_after = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def set_rate(self, rate: float) -> None:
+        """
+        Меняет общий лимит планировщика, например долю лимита бота для воркера
+        :param rate: сообщений в секунду:
+        """
+        self._global = TokenBucket(rate, capacity=rate)
+
+    async def send(self, method: TelegramMethod, priority: int = INTERACTIVE) -> Any:
+        """
+        Ставит запрос в очередь и возвращает ответ Bot API после отправки
+        :param method: TelegramMethod, например message.answer(...) без await:
+        :param priority: INTERACTIVE или BULK:
+        :return: результат метода:
+        """
+        return await self._enqueue(method, priority)
+
+    def enqueue(self, method: TelegramMethod, priority: int = INTERACTIVE) -> asyncio.Future:
+        """
+        Ставит запрос в очередь и сразу возвращает управление. Обработчики отвечают так,
+        чтобы не держать сессию БД обновления, пока сообщение ждёт своей очереди.
+        Ошибка отправки записывается в лог
+        :param method: TelegramMethod, например message.answer(...) без await:
+        :param priority: INTERACTIVE или BULK:
+        :return: asyncio.Future с результатом метода:
+        """
+        future = self._enqueue(method, priority)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def _enqueue(self, method: TelegramMethod, priority: int) -> asyncio.Future:
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run())
+
+        item = _Item(priority=priority, seq=next(self._seq), method=method,
+                     future=asyncio.get_running_loop().create_future())
+        chat_id = getattr(method, "chat_id", None)
+        self._depth[priority] += 1
+        chat_queue = self._chat_queues.get(chat_id)
+        if chat_queue is None:
+            self._chat_queues[chat_id] = deque([item])
+            self._activate(chat_id)
+        else:
+            chat_queue.append(item)
+        return item.future
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Сообщение не отправлено: {future.exception()!r}")
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth_interactive": self._depth[INTERACTIVE],
+            "queue_depth_bulk": self._depth[BULK],
+            "wait_max": self.wait_max,
+        }
+
+    def counters(self) -> dict:
+        """Счётчики, которые только растут с запуска процесса"""
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retry_after": self.retry_after,
+            "wait_seconds": self.wait_total,
+        }
+
+    async def close(self, timeout: float = 10) -> None:
+        """
+        Ждёт отправки очереди, но не дольше timeout секунд, и останавливает планировщик
+        """
+        deadline = time.monotonic() + timeout
+        while self._chat_queues or self._deliveries:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if self._deliveries:
+                await asyncio.wait(self._deliveries, timeout=remaining)
+            else:
+                # Сообщения ждут лимита, планировщик скоро начнёт их отправку
+                await asyncio.sleep(min(remaining, 0.05))
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+
+    def _activate(self, chat_id: Any) -> None:
+        """Ставит чат в кучу готовых, как только его лимит позволит отправить первое сообщение"""
+        chat_queue = self._chat_queues.get(chat_id)
+        if not chat_queue:
+            self._chat_queues.pop(chat_id, None)
+            return
+
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=self.chat_burst)
+        delay = bucket.delay(time.monotonic()) if chat_id is not None else 0
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._activate, chat_id)
+            return
+
+        head = chat_queue[0]
+        heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            delay = max(self._paused_until - now, self._global.delay(now))
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, chat_id = heapq.heappop(self._ready)
+            item = self._chat_queues[chat_id].popleft()
+            self._global.consume()
+            if chat_id is not None:
+                self._chat_buckets[chat_id].consume()
+            task = asyncio.create_task(self._deliver(chat_id, item))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+            if len(self._chat_buckets) > 10000:
+                self._prune_buckets(now)
+
+    async def _deliver(self, chat_id: Any, item: _Item) -> None:
+        waited = time.monotonic() - item.enqueued
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        try:
+            result = await self.bot(item.method)
+        except TelegramRetryAfter as e:
+            logger.warning(f"Bot API попросил подождать {e.retry_after} с, отправка приостановлена")
+            self.retry_after += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            self._chat_queues[chat_id].appendleft(item)  # Повторить первым в своём чате
+        except Exception as e:
+            self.failed += 1
+            self._depth[item.priority] -= 1
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            self.sent += 1
+            self._depth[item.priority] -= 1
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self._activate(chat_id)
+
+    def _prune_buckets(self, now: float) -> None:
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if chat_id not in self._chat_queues and bucket.delay(now) == 0 and bucket.tokens >= bucket.capacity:
+                del self._chat_buckets[chat_id]
+
+
+def bot_rate(workers: int = 1) -> float:
+    """
+    Лимит одного процесса бота: OUTBOUND_RATE за вычетом доли рассылки (broadcast работает
+    отдельным процессом со своим планировщиком), поровну между воркерами
+    :param workers: int:
+    :return: сообщений в секунду:
+    """
+    return (settings.OUTBOUND_RATE - settings.OUTBOUND_BROADCAST_RATE) / workers
+
+
+outbound = OutboundScheduler(
+    bot=bot,
+    rate=bot_rate(),
+    chat_rate=settings.OUTBOUND_CHAT_RATE,
+    chat_burst=settings.OUTBOUND_CHAT_BURST
+)
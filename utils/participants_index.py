@@ -0,0 +1,48 @@
+class ParticipantsIndex:
+    """
+    Индекс зарегистрированных пользователей и выданных билетов текущей лотереи в памяти.
+
+    Индекс знает только о существующих записях: если пользователя или билета в нём нет,
+    ответ нужно проверить в БД (например, запись сделал другой процесс бота).
+    Загружается при запуске и пополняется при каждой регистрации и выдаче билета.
+    """
+
+    def __init__(self):
+        self.lottery_name: str | None = None
+        self._users: set[int] = set()  # telegram_id зарегистрированных пользователей
+        self._tickets: dict[int, int] = {}  # telegram_id -> ticket_number в лотерее lottery_name
+
+    def load(self, lottery_name: str, telegram_ids, tickets) -> None:
+        """
+        Заполняет индекс данными из БД
+        :param lottery_name: str:
+        :param telegram_ids: итерируемый объект telegram_id:
+        :param tickets: итерируемый объект пар (telegram_id, ticket_number):
+        :return: None:
+        """
+        self.lottery_name = lottery_name
+        self._users = set(telegram_ids)
+        self._tickets = dict(tickets)
+        self._users.update(self._tickets)
+
+    def has_user(self, telegram_id: int) -> bool:
+        return telegram_id in self._users
+
+    def add_user(self, telegram_id: int) -> None:
+        self._users.add(telegram_id)
+
+    def get_ticket(self, telegram_id: int, lottery_name: str) -> int | None:
+        if lottery_name != self.lottery_name:
+            return None
+        return self._tickets.get(telegram_id)
+
+    def add_ticket(self, telegram_id: int, lottery_name: str, ticket_number: int) -> None:
+        if lottery_name == self.lottery_name:
+            self._users.add(telegram_id)
+            self._tickets[telegram_id] = ticket_number
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+participants_index = ParticipantsIndex()
@@ -0,0 +1,109 @@
+import asyncio
+from collections import defaultdict, deque
+
+from sqlalchemy import func, update
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+
+from config import settings
+from models.database import AsyncSession
+from models.models import Lottery, Ticket, TicketCounter
+
+from logs.logging_config import logger
+
+
+FIRST_TICKET_NUMBER = 100  # Номера билетов в каждой лотерее начинаются с 100
+
+
+class TicketNumberAllocator:
+    """
+    Выдаёт номера билетов без гонок между процессами.
+
+    Процесс атомарно увеличивает счётчик лотереи в таблице ticket_counters сразу на
+    block_size и раздаёт полученный блок номеров из памяти. Номера, не выданные до
+    перезапуска процесса, просто пропускаются: номера уникальны, но могут идти с пропусками.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._blocks: dict[str, list[int]] = {}  # lottery_name -> [следующий номер, последний номер]
+        self._released: dict[str, deque] = defaultdict(deque)
+        self._locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def allocate(self, lottery_name: str) -> int | None:
+        """
+        Возвращает следующий свободный номер билета лотереи
+        :param lottery_name: str:
+        :return: ticket_number или None, если лотерея не найдена:
+        """
+        released = self._released[lottery_name]
+        if released:
+            return released.popleft()
+
+        while True:
+            block = self._blocks.get(lottery_name)
+            if block and block[0] <= block[1]:
+                number = block[0]
+                block[0] += 1
+                return number
+
+            async with self._locks[lottery_name]:
+                block = self._blocks.get(lottery_name)
+                if not block or block[0] > block[1]:
+                    block = await self._reserve_block(lottery_name)
+                    if block is None:
+                        return None
+                    self._blocks[lottery_name] = block
+
+    def release(self, lottery_name: str, ticket_number: int) -> None:
+        """
+        Возвращает неиспользованный номер, чтобы выдать его следующему пользователю
+        :param lottery_name: str:
+        :param ticket_number: int:
+        :return: None:
+        """
+        self._released[lottery_name].append(ticket_number)
+
+    async def _reserve_block(self, lottery_name: str) -> list[int] | None:
+        """
+        Резервирует в БД следующий блок номеров одним атомарным запросом
+        """
+        async with AsyncSession() as session:
+            lottery_id = select(Lottery.id).where(Lottery.name == lottery_name).scalar_subquery()
+            query_update = (
+                update(TicketCounter)
+                .where(TicketCounter.lottery_id == lottery_id)
+                .values(last_number=TicketCounter.last_number + self.block_size)
+                .returning(TicketCounter.last_number)
+            )
+            last_number = (await session.execute(query_update)).scalar_one_or_none()
+
+            if last_number is None:
+                # Первый блок лотереи: начинаем с 100 или продолжаем после уже выданных билетов
+                query_seed = (
+                    select(
+                        Lottery.id,
+                        func.greatest(func.max(Ticket.ticket_number), FIRST_TICKET_NUMBER - 1) + self.block_size
+                    )
+                    .select_from(Lottery)
+                    .outerjoin(Ticket, Ticket.lottery_id == Lottery.id)
+                    .where(Lottery.name == lottery_name)
+                    .group_by(Lottery.id)
+                )
+                query_insert = insert(TicketCounter).from_select(["lottery_id", "last_number"], query_seed)
+                query_insert = query_insert.on_conflict_do_update(
+                    index_elements=[TicketCounter.lottery_id],
+                    set_={"last_number": TicketCounter.last_number + self.block_size}
+                ).returning(TicketCounter.last_number)
+                last_number = (await session.execute(query_insert)).scalar_one_or_none()
+
+            await session.commit()
+
+        if last_number is None:
+            logger.error(f"Лотерея с именем {lottery_name} не найдена, номер билета не выдан.")
+            return None
+
+        return [last_number - self.block_size + 1, last_number]
+
+
+ticket_allocator = TicketNumberAllocator(block_size=settings.TICKET_BLOCK_SIZE)
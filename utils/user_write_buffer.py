@@ -0,0 +1,136 @@
+import asyncio
+
+from sqlalchemy import BigInteger, Boolean, String, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from config import settings
+from metrics.metrics import track_db_operation
+from models.database import AsyncSession
+from models.models import User
+
+from logs.logging_config import logger
+
+
+_COLUMNS = {
+    "telegram_id": BigInteger,
+    "full_name": String,
+    "full_name_from_tg": String,
+    "username": String,
+    "is_active": Boolean,
+}
+
+# Строки передаются массивами по колонкам и разворачиваются unnest: текст запроса не зависит
+# от размера группы, поэтому подготовленное выражение asyncpg переиспользуется
+_QUERY_INSERT_USERS = (
+    insert(User)
+    .from_select(
+        list(_COLUMNS),
+        select(*(func.unnest(bindparam(name, type_=ARRAY(type_))) for name, type_ in _COLUMNS.items()))
+    )
+    .on_conflict_do_nothing(index_elements=[User.telegram_id])
+    .returning(User.telegram_id)
+)
+
+
+class UserWriteBuffer:
+    """
+    Групповая запись новых пользователей (group commit).
+
+    save() ставит строку в буфер и ждёт, пока она будет записана. Буфер сбрасывается одним
+    INSERT ... ON CONFLICT (telegram_id) DO NOTHING на все накопленные строки, как только
+    набралось max_rows строк или прошло max_delay секунд с первой из них. Так при волне
+    регистраций тысячи коротких транзакций заменяются несколькими, а обработчик по-прежнему
+    отвечает пользователю только после записи в БД.
+    """
+
+    def __init__(self, max_rows: int, max_delay: float):
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    async def save(self, telegram_id: int, full_name: str, full_name_from_tg: str, username: str) -> bool | None:
+        """
+        Ставит пользователя в буфер и ждёт записи
+        :return: True — пользователь записан сейчас, False — он уже был в БД, None — ошибка БД:
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((
+            {
+                "telegram_id": telegram_id,
+                "full_name": full_name,
+                "full_name_from_tg": full_name_from_tg,
+                "username": username,
+                "is_active": True
+            },
+            future
+        ))
+        if len(self._pending) >= self.max_rows:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+        return await future
+
+    async def close(self) -> None:
+        """
+        Записывает оставшиеся строки и ждёт завершения всех записей
+        """
+        self._start_flush()
+        if self._flushes:
+            await asyncio.wait(self._flushes)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        # Повторное нажатие могло поставить одного пользователя дважды: в запрос идёт одна строка
+        rows = list({row["telegram_id"]: row for row, _ in reversed(batch)}.values())
+        inserted = None
+        try:
+            inserted = await save_users_batch(rows)
+        except Exception as e:
+            # Не только SQLAlchemyError: при недоступной БД asyncpg бросает OSError,
+            # а ожидающие save() всё равно должны получить ответ
+            logger.error(f"Ошибка групповой записи {len(rows)} пользователей: {e!r}")
+        finally:
+            # Дубликат одного пользователя в группе получает True только один раз
+            for row, future in batch:
+                if not future.done():
+                    if inserted is None:
+                        future.set_result(None)
+                    else:
+                        future.set_result(row["telegram_id"] in inserted)
+                        inserted.discard(row["telegram_id"])
+
+
+@track_db_operation
+async def save_users_batch(rows: list[dict]) -> set[int]:
+    """
+    Записывает пользователей одним запросом, уже существующие пропускает
+    :param rows: list[dict]: значения колонок users:
+    :return: telegram_id действительно вставленных строк:
+    """
+    async with AsyncSession() as session:
+        result = await session.execute(
+            _QUERY_INSERT_USERS,
+            {name: [row[name] for row in rows] for name in _COLUMNS}
+        )
+        inserted = set(result.scalars())
+        await session.commit()
+    return inserted
+
+
+user_write_buffer = UserWriteBuffer(
+    max_rows=settings.USER_WRITE_BUFFER_SIZE,
+    max_delay=settings.USER_WRITE_BUFFER_DELAY
+)
@@ -1,4 +1,6 @@
 import asyncio
+import html
+
 import aiosmtplib
 from email.message import EmailMessage
 
@@ -8,6 +10,30 @@ from config import settings
 from logs.logging_config import logger
 
 
+def build_registration_html(registrations: list[tuple]) -> str:
+    """
+    HTML-разметка письма о новых регистрациях
+    :param registrations: список (telegram_id, full_name, full_name_from_tg, username):
+    :return: str:
+    """
+    # Имя и username из Telegram задаёт сам пользователь, поэтому все значения экранируются
+    blocks = "\n                <hr>".join(
+        f"""
+                <p><strong>Telegram ID:</strong> {html.escape(str(telegram_id))}</p>
+                <p><strong>Введенное ФИО при регистрации:</strong> {html.escape(full_name)}</p>
+                <p><strong>Полное имя из Telegram:</strong> {html.escape(full_name_from_tg)}</p>
+                <p><strong>Username из Telegram:</strong> {html.escape(username)}</p>"""
+        for telegram_id, full_name, full_name_from_tg, username in registrations
+    )
+    return f"""
+        <html>
+            <body>
+                <h1>Новая регистрация в телеграм Канале</h1>{blocks}
+            </body>
+        </html>
+        """
+
+
 async def send_email(telegram_id, full_name, full_name_from_tg, username):
     message = EmailMessage()
     message["From"] = settings.SENDER_EMAIL
@@ -15,17 +41,7 @@ async def send_email(telegram_id, full_name, full_name_from_tg, username):
     message["Subject"] = "Новая регистрация в телеграм Канале"
 
     # HTML-разметка для письма
-    html_content = f"""
-        <html>
-            <body>
-                <h1>Новая регистрация в телеграм Канале</h1>
-                <p><strong>Telegram ID:</strong> {telegram_id}</p>
-                <p><strong>Введенное ФИО при регистрации:</strong> {full_name}</p>
-                <p><strong>Полное имя из Telegram:</strong> {full_name_from_tg}</p>
-                <p><strong>Username из Telegram:</strong> {username}</p>
-            </body>
-        </html>
-        """
+    html_content = build_registration_html([(telegram_id, full_name, full_name_from_tg, username)])
 
     # Устанавливаем HTML-разметку как содержимое письма
     message.set_content(html_content, subtype='html')
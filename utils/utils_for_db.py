@@ -1,39 +1,165 @@
-from sqlalchemy import exists, join
+from datetime import datetime
+
+from sqlalchemy import bindparam, exists, func, join, literal, text, union_all
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-
-from models.database import AsyncSession, SessionLocal
-from models.models import User, Lottery, Ticket
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.database import (
+    AsyncSession,
+    DbSession,
+    ReadAsyncSession,
+    get_read_session,
+    get_session,
+    read_your_writes
+)
+from metrics.metrics import tickets_issued, track_db_operation
+from models.models import User, Lottery, Ticket, ticket_partition_name
+from utils.lottery_stats import lottery_stats
+from utils.participants_index import participants_index
+from utils.ticket_allocator import ticket_allocator
+from utils.user_write_buffer import user_write_buffer
 
 from logs.logging_config import logger
 
 
-async def is_exists_user(telegram_id: int) -> bool:
+# Запросы горячего пути собираются один раз при импорте, а значения передаются через bindparam:
+# SQLAlchemy не пересобирает выражение и берёт готовый SQL из кэша компиляции,
+# а asyncpg переиспользует подготовленное выражение из своего кэша на соединении.
+# Функции, которые только читают, берут сессию через get_read_session: при настроенной реплике
+# запросы идут в неё, кроме данных пользователя, который только что записывал в основную БД
+_QUERY_IS_EXISTS_USER = select(exists().where(User.telegram_id == bindparam("telegram_id")))
+
+_QUERY_USER_BY_TELEGRAM_ID = select(User).where(User.telegram_id == bindparam("telegram_id"))
+
+_QUERY_LOTTERY_BY_NAME = select(Lottery).where(Lottery.name == bindparam("lottery_name"))
+
+_QUERY_USER_TICKET_NUMBER = (
+    select(Ticket.ticket_number)
+    .join(Ticket.lottery)
+    .join(Ticket.user)
+    .where(Lottery.name == bindparam("lottery_name"), User.telegram_id == bindparam("telegram_id"))
+)
+
+_QUERY_TICKET_NUMBER = select(Ticket.ticket_number).where(
+    Ticket.lottery_id == bindparam("lottery_id"),
+    Ticket.user_id == bindparam("user_id")
+)
+
+_QUERY_TICKET_NUMBER_BY_TELEGRAM_ID = (
+    select(Ticket.ticket_number)
+    .join(Ticket.user)
+    .where(Ticket.lottery_id == bindparam("lottery_id"), User.telegram_id == bindparam("telegram_id"))
+)
+
+# Полная выгрузка лотереи: идёт по индексу ix_tickets_lottery_id_ticket_number в порядке номеров
+_QUERY_LOTTERY_DATA = (
+    select(
+        User.telegram_id,
+        User.full_name,
+        User.full_name_from_tg,
+        Lottery.name,
+        Ticket.ticket_number
+    )
+    .select_from(
+        join(Ticket, User, Ticket.user_id == User.id)  # Объединение Ticket с User
+        .join(Lottery, Ticket.lottery_id == Lottery.id)  # Объединение с Lottery
+    ).where(Lottery.name == bindparam("lottery_name"))
+    .order_by(Ticket.ticket_number)
+)
+
+_QUERY_LOTTERY_TICKETS = (
+    select(User.telegram_id, Ticket.ticket_number)
+    .join(Ticket.user)
+    .join(Ticket.lottery)
+    .where(Lottery.name == bindparam("lottery_name"))
+)
+
+# Сверка статистики: count и max по секции лотереи читаются из индекса ix_tickets_lottery_id_ticket_number
+_QUERY_LOTTERY_ID = select(Lottery.id).where(Lottery.name == bindparam("lottery_name")).scalar_subquery()
+_QUERY_LOTTERY_STATS = select(
+    select(func.count()).select_from(Ticket).where(Ticket.lottery_id == _QUERY_LOTTERY_ID)
+    .scalar_subquery().label("tickets"),
+    select(func.max(Ticket.ticket_number)).where(Ticket.lottery_id == _QUERY_LOTTERY_ID)
+    .scalar_subquery().label("last_ticket_number"),
+    select(func.count()).select_from(User).scalar_subquery().label("registrations")
+)
+
+
+def _build_query_get_or_create_ticket():
+    query_user = select(User.id).where(User.telegram_id == bindparam("telegram_id")).cte("query_user")
+    query_insert = (
+        insert(Ticket)
+        .from_select(
+            ["user_id", "lottery_id", "ticket_number", "create"],
+            select(
+                query_user.c.id,
+                bindparam("lottery_id", type_=Ticket.lottery_id.type),
+                bindparam("ticket_number", type_=Ticket.ticket_number.type),
+                bindparam("create", type_=Ticket.create.type)
+            )
+        )
+        .on_conflict_do_nothing(constraint="unique_ticket_per_lottery")
+        .returning(Ticket.ticket_number)
+        .cte("query_insert")
+    )
+    # Вставленная строка не видна остальной части запроса, поэтому вторая часть
+    # возвращает только билет, выданный раньше
+    return union_all(
+        select(query_insert.c.ticket_number, literal(True).label("is_new")),
+        select(Ticket.ticket_number, literal(False).label("is_new"))
+        .join(query_user, Ticket.user_id == query_user.c.id)
+        .where(Ticket.lottery_id == bindparam("lottery_id"))
+    )
+
+
+_QUERY_GET_OR_CREATE_TICKET = _build_query_get_or_create_ticket()
+
+
+def _is_number_taken(error: SQLAlchemyError) -> bool:
+    """
+    Номер билета уже есть в БД (нарушен уникальный индекс номера):
+    возвращать его в ticket_allocator нельзя, иначе он будет выдан снова
+    """
+    return isinstance(error, IntegrityError) and "ix_tickets_lottery_id_ticket_number" in str(error.orig)
+
+
+@track_db_operation
+async def is_exists_user(telegram_id: int, session: DbSession | None = None) -> bool:
     """
     Функция для проверки существования в БД пользователя по telegram_id
     :param telegram_id:
+    :param session: сессия текущего обновления, если None — открывается новая:
     :return: bool:
     """
+    if participants_index.has_user(telegram_id):
+        return True
+
     try:
-        async with AsyncSession() as session:
-            # Создание запроса на проверку существования
-            query = select(exists().where(User.telegram_id == telegram_id))
-            result = await session.execute(query)  # Выполнение запроса
-            return result.scalar()  # Получение результата (True или False)
+        async with get_read_session(session, telegram_id) as session:
+            # Выполнение запроса на проверку существования
+            result = await session.execute(_QUERY_IS_EXISTS_USER, {"telegram_id": telegram_id})
+            is_exists = result.scalar()  # Получение результата (True или False)
+            if is_exists:
+                participants_index.add_user(telegram_id)
+            return is_exists
     except SQLAlchemyError as e:
         logger.error(f"Ошибка при проверке is_exists_user с ID {telegram_id}: {e}")
 
 
-async def get_user_by_telegram_id(telegram_id: int):
+@track_db_operation
+async def get_user_by_telegram_id(telegram_id: int, session: DbSession | None = None):
     """
     Возвращает пользователя по telegram_id
     :param telegram_id:
+    :param session: сессия текущего обновления, если None — открывается новая:
     :return: user:
     """
     try:
-        async with AsyncSession() as session:
-            query = select(User).where(User.telegram_id == telegram_id)
-            result = await session.execute(query)
+        async with get_read_session(session, telegram_id) as session:
+            result = await session.execute(_QUERY_USER_BY_TELEGRAM_ID, {"telegram_id": telegram_id})
             user = result.scalar_one_or_none()
 
             if not user:
@@ -45,43 +171,66 @@ async def get_user_by_telegram_id(telegram_id: int):
         logger.error(f"Ошибка при получении get_user_by_telegram_id с ID {telegram_id}: {e}")
 
 
-async def update_is_active_user_by_id(telegram_id: int, full_name: str) -> User:
+@track_db_operation
+async def update_is_active_user_by_id(
+        telegram_id: int,
+        full_name: str,
+        session: DbSession | None = None
+) -> User:
     """
     Возвращает пользователя по telegram_id
     :param telegram_id:
     :param full_name:
+    :param session: сессия текущего обновления, если None — открывается новая:
     :return: user:
     """
     try:
-        async with AsyncSession() as session:
+        async with get_session(session) as session:
             query = select(User).where(User.telegram_id == telegram_id)
             result = await session.execute(query)
             user = result.scalar_one_or_none()
             user.full_name = full_name
             user.is_active = True
             await session.commit()
+            read_your_writes.mark(telegram_id)
             await session.refresh(user)
             return user
     except SQLAlchemyError as e:
         logger.error(f"Ошибка при обновлении update_is_active_user_by_id с ID {telegram_id}: {e}")
 
 
+@track_db_operation
 async def save_user(
         telegram_id: int,
         full_name: str,
         full_name_from_tg: str,
-        username: str
-) -> None:
+        username: str,
+        session: DbSession | None = None
+) -> bool:
     """
     Функция для сохранения пользователя в БД
     :param telegram_id: int:
     :param full_name: str:
     :param full_name_from_tg: str:
     :param username: str:
-    :return: None:
+    :param session: сессия текущего обновления, если None — открывается новая:
+    :return: True, если пользователь записан сейчас:
     """
+    if settings.USER_WRITE_BUFFER:
+        # Запись вместе с другими регистрациями, сессия обновления не используется
+        inserted = await user_write_buffer.save(telegram_id, full_name, full_name_from_tg, username)
+        if inserted is None:
+            return False
+        # Даже при конфликте: строка пользователя есть в основной БД
+        read_your_writes.mark(telegram_id)
+        participants_index.add_user(telegram_id)
+        if inserted:
+            lottery_stats.add_registration()
+            logger.info(f"Пользователь {full_name} с ID {telegram_id} успешно добавлен.")
+        return inserted
+
     try:
-        async with AsyncSession() as session:
+        async with get_session(session) as session:
             new_user = User(
                 telegram_id=telegram_id,
                 full_name=full_name,
@@ -91,86 +240,134 @@ async def save_user(
 
             session.add(new_user)
             await session.commit()
+            read_your_writes.mark(telegram_id)
+            participants_index.add_user(telegram_id)
+            lottery_stats.add_registration()
             logger.info(f"Пользователь {full_name} с ID {telegram_id} успешно добавлен.")
+            return True
 
     except SQLAlchemyError as e:
         logger.error(f"Ошибка при save_user сохранении пользователя{full_name} с ID {telegram_id}: {e}")
+        return False
 
 
-async def get_lottery_data(name):
+@track_db_operation
+async def get_lottery_data(name, session: DbSession | None = None):
     """
     Получить данные о пользователях и билетах для определенной лотереи.
+    Загружает всю лотерею в память, для больших лотерей используйте iter_lottery_data.
     :param name: Название лотереи.
+    :param session: Сессия текущего обновления, если None — открывается новая.
     :return: Список с данными пользователей и их билетами.
     """
-    async with AsyncSession() as session:
-        query = (
-            select(
-                User.telegram_id,
-                User.full_name,
-                User.full_name_from_tg,
-                Lottery.name,
-                Ticket.ticket_number
-            )
-            .select_from(
-                join(Ticket, User, Ticket.user_id == User.id)  # Объединение Ticket с User
-                .join(Lottery, Ticket.lottery_id == Lottery.id)  # Объединение с Lottery
-            ).where(Lottery.name == name)
+    result_data = []
+    async for chunk in iter_lottery_data(name, session=session):
+        result_data.extend(chunk)
+    return result_data
+
+
+async def iter_lottery_data(name, chunk_size: int = 1000, session: DbSession | None = None):
+    """
+    Отдаёт данные о пользователях и билетах лотереи частями через курсор на стороне сервера,
+    поэтому в памяти одновременно находится не больше chunk_size строк.
+    :param name: Название лотереи.
+    :param chunk_size: Количество строк в одной части.
+    :param session: Сессия текущего обновления, если None — открывается новая.
+    :return: Асинхронный генератор списков словарей, упорядоченных по номеру билета.
+    """
+    async with get_read_session(session) as session:
+        # stream() читает результат через курсор, а не загружает его целиком
+        result = await session.stream(
+            _QUERY_LOTTERY_DATA.execution_options(yield_per=chunk_size),
+            {"lottery_name": name}
         )
 
-        # Выполняем запрос
-        result = await session.execute(query)
+        async for rows in result.partitions():
+            # Преобразуем часть результата в список словарей
+            yield [
+                {
+                    "telegram_id": row.telegram_id,
+                    "full_name": row.full_name,
+                    "full_name_from_tg": row.full_name_from_tg,
+                    "lottery_name": row.name,
+                    "ticket_number": row.ticket_number
+                }
+                for row in rows
+            ]
+
+
+@track_db_operation
+async def warm_participants_index(lottery_name: str) -> None:
+    """
+    Загружает в participants_index всех пользователей и билеты лотереи
+    :param lottery_name: str:
+    :return: None:
+    """
+    try:
+        async with ReadAsyncSession() as session:
+            telegram_ids = await session.scalars(select(User.telegram_id))
+            tickets = await session.execute(_QUERY_LOTTERY_TICKETS, {"lottery_name": lottery_name})
+            participants_index.load(lottery_name, telegram_ids, tickets.tuples())
+        logger.info(f"Индекс участников загружен: {len(participants_index)} пользователей.")
+    except SQLAlchemyError as e:
+        logger.error(f"Ошибка загрузки warm_participants_index для лотереи {lottery_name}: {e}")
 
-        # Извлекаем все данные
-        data = result.fetchall()
 
-        # Преобразуем результат в список словарей
-        result_data = [
-            {
-                "telegram_id": row.telegram_id,
-                "full_name": row.full_name,
-                "full_name_from_tg": row.full_name_from_tg,
-                "lottery_name": row.name,
-                "ticket_number": row.ticket_number
-            }
-            for row in data
-        ]
-        return result_data
+@track_db_operation
+async def reconcile_lottery_stats(lottery_name: str) -> None:
+    """
+    Сверяет счётчики lottery_stats с БД
+    :param lottery_name: str:
+    :return: None:
+    """
+    try:
+        # Основная БД: отставание реплики выглядело бы как откат счётчиков
+        async with AsyncSession() as session:
+            result = (await session.execute(_QUERY_LOTTERY_STATS, {"lottery_name": lottery_name})).one()
+        lottery_stats.reconcile(lottery_name, result.tickets, result.last_ticket_number, result.registrations)
+    except SQLAlchemyError as e:
+        logger.error(f"Ошибка сверки reconcile_lottery_stats для лотереи {lottery_name}: {e}")
 
 
-async def check_user_ticket(telegram_id: int, lottery_name: str):
+@track_db_operation
+async def check_user_ticket(telegram_id: int, lottery_name: str, session: DbSession | None = None):
     """
     Проверяет есть ли уже билет у пользователя в текущей лотерее
     """
+    if participants_index.get_ticket(telegram_id, lottery_name) is not None:
+        return True
+
     try:
-        async with AsyncSession() as session:
-            query = (
-                select(Ticket)
-                .join(Ticket.lottery)
-                .join(Ticket.user)
-                .where(Lottery.name == lottery_name, User.telegram_id == telegram_id)
-            )
-            result = await session.execute(query)  # Выполнение запроса
-            ticket = result.scalars().first()
-            return ticket is not None
+        async with get_read_session(session, telegram_id) as session:
+            result = await session.execute(
+                _QUERY_USER_TICKET_NUMBER,
+                {"lottery_name": lottery_name, "telegram_id": telegram_id}
+            )  # Выполнение запроса
+            ticket_number = result.scalars().first()
+            if ticket_number is None:
+                return False
+
+            participants_index.add_ticket(telegram_id, lottery_name, ticket_number)
+            return True
     except SQLAlchemyError as e:
         logger.error(f"Ошибка при проверке check_user_ticket с ID {telegram_id}: {e}")
 
 
-async def get_number_ticket_current_lottery(lottery: Lottery, user: User):
+@track_db_operation
+async def get_number_ticket_current_lottery(lottery: Lottery, user: User, session: DbSession | None = None):
     """
     Возвращает номер билета определеного пользователя определенной лотереи
     :param lottery: Lottery,
     :param user: User,
+    :param session: сессия текущего обновления, если None — открывается новая,
     :return: ticket_number:
     """
     try:
-        async with AsyncSession() as session:
-            query = select(Ticket.ticket_number).where(
-                Ticket.lottery_id == lottery.id,
-                Ticket.user_id == user.id
+        async with get_read_session(session, user.telegram_id) as session:
+            result_ticket_number = await session.execute(
+                _QUERY_TICKET_NUMBER,
+                {"lottery_id": lottery.id, "user_id": user.id}
             )
-            result_ticket_number = await session.execute(query)
             ticket_number = result_ticket_number.scalar_one_or_none()
             if ticket_number is None:
                 logger.info(f"Билет для пользователя {user.id} в лотерее {lottery.name} не найден.")
@@ -181,18 +378,18 @@ async def get_number_ticket_current_lottery(lottery: Lottery, user: User):
         return None
 
 
-async def get_lottery_by_name(lottery_name: str):
+@track_db_operation
+async def get_lottery_by_name(lottery_name: str, session: DbSession | None = None):
     """
     Возвращает объект лотереи по имени
     """
     try:
-        async with AsyncSession() as session:
-            query_lottery = select(Lottery).filter(Lottery.name == lottery_name)
-            result_lottery = await session.execute(query_lottery)
+        async with get_read_session(session) as session:
+            result_lottery = await session.execute(_QUERY_LOTTERY_BY_NAME, {"lottery_name": lottery_name})
             lottery = result_lottery.scalar_one_or_none()
 
             if not lottery:
-                logger.error(f"Лотерея с именем {lottery.name} не найдена.")
+                logger.error(f"Лотерея с именем {lottery_name} не найдена.")
                 return None
 
             return lottery
@@ -201,32 +398,106 @@ async def get_lottery_by_name(lottery_name: str):
         logger.error(f"Ошибка получения get_lottery_by_name по имени {lottery_name}: {e}")
 
 
-async def create_ticket(lottery: Lottery, user: User):
+@track_db_operation
+async def create_ticket(lottery: Lottery, user: User, session: DbSession | None = None):
     """
     Сохраняет и возвращает номер билета определенного пользователя в определенной лотереи
     """
+    next_ticket_number = None
     try:
-        async with AsyncSession() as session:
-            query_ticket = select(Ticket).filter(Ticket.lottery_id == lottery.id).order_by(
-                Ticket.ticket_number.desc()).limit(1)
-            result_ticket = await session.execute(query_ticket)
-            max_ticket = result_ticket.scalar_one_or_none()
-
-            # Начинаем с 100, если нет билетов
-            next_ticket_number = 100 if not max_ticket else max_ticket.ticket_number + 1
+        next_ticket_number = await ticket_allocator.allocate(lottery.name)
+        if next_ticket_number is None:
+            return None
 
-            # Создаём новый билет
+        async with get_session(session) as session:
+            # Создаём новый билет с номером из зарезервированного блока
             new_ticket = Ticket(user_id=user.id, lottery_id=lottery.id, ticket_number=next_ticket_number)
             session.add(new_ticket)
             await session.commit()
-            await session.refresh(new_ticket)
 
+        read_your_writes.mark(user.telegram_id)
+        participants_index.add_ticket(user.telegram_id, lottery.name, next_ticket_number)
+        lottery_stats.add_ticket(lottery.name, next_ticket_number)
+        tickets_issued.inc()
         return f"{next_ticket_number}"
 
     except SQLAlchemyError as e:
+        if next_ticket_number is not None and not _is_number_taken(e):
+            ticket_allocator.release(lottery.name, next_ticket_number)
         logger.error(f"Ошибка получения номера билета create_ticket "
                      f"Лотерея:{lottery.name} User:{user.full_name} tg_id{user.telegram_id} : {e}")
 
+
+@track_db_operation
+async def get_or_create_ticket(
+        telegram_id: int,
+        lottery: Lottery,
+        session: DbSession | None = None
+) -> tuple[int | None, bool]:
+    """
+    Одним запросом находит пользователя, выдаёт билет, если его ещё нет,
+    и возвращает номер билета. Повторная выдача исключается ограничением unique_ticket_per_lottery.
+    :param telegram_id: int:
+    :param lottery: Lottery или LotterySnapshot:
+    :param session: сессия текущего обновления, если None — открывается новая:
+    :return: (ticket_number, is_new): ticket_number равен None, если билет выдать не удалось
+    """
+    lottery_name = lottery.name
+    ticket_number = participants_index.get_ticket(telegram_id, lottery_name)
+    if ticket_number is not None:
+        return ticket_number, False
+
+    try:
+        ticket_number = await ticket_allocator.allocate(lottery_name)
+        if ticket_number is None:
+            return None, False
+
+        async with get_session(session) as session:
+            result = (await session.execute(
+                _QUERY_GET_OR_CREATE_TICKET,
+                {
+                    "telegram_id": telegram_id,
+                    "lottery_id": lottery.id,
+                    "ticket_number": ticket_number,
+                    "create": datetime.utcnow()
+                }
+            )).first()
+            await session.commit()
+
+            if result is None:
+                # Параллельное нажатие того же пользователя вставило билет раньше: ON CONFLICT
+                # дождался его транзакции, но вторая часть запроса читает снимок на начало запроса
+                # и билета не видит. Новый запрос (READ COMMITTED) видит его
+                existing_number = await session.scalar(
+                    _QUERY_TICKET_NUMBER_BY_TELEGRAM_ID,
+                    {"telegram_id": telegram_id, "lottery_id": lottery.id}
+                )
+                if existing_number is not None:
+                    ticket_allocator.release(lottery_name, ticket_number)
+                    participants_index.add_ticket(telegram_id, lottery_name, existing_number)
+                    return existing_number, False
+
+        if result is None:
+            ticket_allocator.release(lottery_name, ticket_number)
+            logger.error(f"Билет не выдан: пользователь tg_id{telegram_id} не найден.")
+            return None, False
+
+        if result.is_new:
+            read_your_writes.mark(telegram_id)
+            lottery_stats.add_ticket(lottery_name, result.ticket_number)
+            tickets_issued.inc()
+        else:
+            ticket_allocator.release(lottery_name, ticket_number)
+
+        participants_index.add_ticket(telegram_id, lottery_name, result.ticket_number)
+        return result.ticket_number, result.is_new
+
+    except SQLAlchemyError as e:
+        if ticket_number is not None and not _is_number_taken(e):
+            ticket_allocator.release(lottery_name, ticket_number)
+        logger.error(f"Ошибка get_or_create_ticket tg_id{telegram_id} Лотерея:{lottery_name} : {e}")
+        return None, False
+
 ##############################################################################################
 # Этот подход возвращает только булево значение и может быть быстрее, если нет необходимости
 # загружать сам объект билета.
@@ -243,16 +514,61 @@ async def create_ticket(lottery: Lottery, user: User):
 ##############################################################################################
 
 
-def create_lottery(session: SessionLocal, name: str, description: str = ''):
+def create_ticket_partition(session: Session, lottery_id: int) -> None:
+    """
+    Создаёт секцию таблицы tickets для билетов лотереи (без commit)
+    :param session: Session:
+    :param lottery_id: int:
+    :return: None:
+    """
+    session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {ticket_partition_name(lottery_id)} "
+        f"PARTITION OF tickets FOR VALUES IN ({int(lottery_id)})"
+    ))
+
+
+def create_lottery(session: Session, name: str, description: str = ''):
     """
-    Создает лотерею в БД
+    Создает лотерею в БД вместе с секцией для её билетов
     """
     try:
         lottery = Lottery(name=name, description=description)
         session.add(lottery)
+        session.flush()  # Получаем id лотереи для секции в той же транзакции
+        create_ticket_partition(session, lottery.id)
         session.commit()
         session.refresh(lottery)  # Обновление объекта для получения ID и других данных
         return {"success": True, "lottery": lottery}
     except IntegrityError:
         session.rollback()  # Откат изменений в случае ошибки
         return {"success": False, "error": "Лотерея с таким именем уже существует."}
+
+
+def detach_ticket_partition(session: Session, lottery_name: str, archive_schema: str | None = "archive"):
+    """
+    Отсоединяет секцию билетов завершённой лотереи от таблицы tickets. Билеты остаются
+    в отдельной таблице и перестают участвовать в запросах бота, выгрузке и розыгрыше.
+    :param session: Session:
+    :param lottery_name: str:
+    :param archive_schema: схема, куда переносится секция; None — оставить в текущей схеме:
+    :return: dict:
+    """
+    lottery = session.scalar(select(Lottery).where(Lottery.name == lottery_name))
+    if lottery is None:
+        return {"success": False, "error": "Лотерея с таким именем не найдена."}
+
+    partition = ticket_partition_name(lottery.id)
+    try:
+        session.execute(text(f"ALTER TABLE tickets DETACH PARTITION {partition}"))
+        if archive_schema:
+            session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"'))
+            session.execute(text(f'ALTER TABLE {partition} SET SCHEMA "{archive_schema}"'))
+        session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        logger.error(f"Ошибка отсоединения секции {partition} лотереи {lottery_name}: {e}")
+        return {"success": False, "error": str(e)}
+
+    table = f"{archive_schema}.{partition}" if archive_schema else partition
+    logger.info(f"Билеты лотереи {lottery_name} перенесены в {table}")
+    return {"success": True, "table": table}
@@ -0,0 +1,113 @@
+"""
+Приём обновлений Telegram через webhook.
+
+Для локальной проверки оставьте WEBHOOK_BASE_URL пустым (webhook не регистрируется в Telegram)
+и отправьте записанное обновление:
+    curl -X POST localhost:8080/webhook -H "Content-Type: application/json" \\
+         -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" -d @update.json
+"""
+import asyncio
+import signal
+from hmac import compare_digest
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+from config import settings
+
+from logs.logging_config import logger
+
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookHandler:
+    """
+    Отвечает Telegram 200 сразу после разбора обновления, а сам обработчик запускает в фоне.
+    Одновременно выполняется не больше max_concurrency обработчиков.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, secret_token: str, max_concurrency: int):
+        self.dp = dp
+        self.bot = bot
+        self.secret_token = secret_token
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret_token and not compare_digest(request.headers.get(SECRET_TOKEN_HEADER, ""), self.secret_token):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except (ValueError, ValidationError) as e:
+            logger.warning(f"Некорректное обновление в webhook: {e}")
+            return web.Response(status=400)
+
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def wait_closed(self, timeout: float) -> None:
+        """
+        Ждёт завершения обработчиков, запущенных до остановки сервера
+        """
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        if pending:
+            logger.warning(f"Не дождались {len(pending)} обработчиков при остановке webhook.")
+            for task in pending:
+                task.cancel()
+
+    async def _process(self, update: Update) -> None:
+        async with self._semaphore:
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logger.exception(f"Ошибка обработки обновления {update.update_id}: {e}")
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """
+    Запускает HTTP-сервер webhook и работает до SIGINT/SIGTERM
+    """
+    handler = WebhookHandler(
+        dp=dp,
+        bot=bot,
+        secret_token=settings.WEBHOOK_SECRET.get_secret_value(),
+        max_concurrency=settings.WEBHOOK_MAX_CONCURRENCY
+    )
+    app = web.Application()
+    app.router.add_post(settings.WEBHOOK_PATH, handler.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.WEBHOOK_HOST, port=settings.WEBHOOK_PORT)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await dp.emit_startup(bot=bot)
+    try:
+        await site.start()
+        if settings.WEBHOOK_BASE_URL:
+            await bot.set_webhook(
+                url=settings.WEBHOOK_BASE_URL.rstrip("/") + settings.WEBHOOK_PATH,
+                secret_token=settings.WEBHOOK_SECRET.get_secret_value() or None,
+                allowed_updates=dp.resolve_used_update_types(),
+                max_connections=100
+            )
+        logger.info(f"Webhook слушает {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+        await stop_event.wait()
+    finally:
+        logger.info("Остановка webhook")
+        await site.stop()  # Новые запросы больше не принимаются
+        await handler.wait_closed(timeout=settings.WEBHOOK_SHUTDOWN_TIMEOUT)
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
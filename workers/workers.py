@@ -0,0 +1,169 @@
+"""
+Многопроцессный режим: главный процесс получает обновления long polling и раздаёт их
+процессам-воркерам. Обновления одного пользователя всегда попадают в один воркер и
+обрабатываются в нём по очереди, поэтому шаги Registration не перемешиваются.
+Каждый воркер — отдельный интерпретатор со своим пулом соединений и своими кэшами.
+
+Лимит Bot API общий для токена, поэтому каждый воркер отправляет не больше
+(OUTBOUND_RATE - OUTBOUND_BROADCAST_RATE) / WORKERS сообщений в секунду (см. bot_rate).
+Лимит на чат делить не нужно: личный чат совпадает с id пользователя, и все его сообщения
+отправляет один воркер.
+"""
+import asyncio
+import multiprocessing
+import signal
+from typing import Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates
+from aiogram.types import Update
+
+from config import settings
+
+from logs.logging_config import logger
+
+
+def get_worker_index(update: Update, workers: int) -> int:
+    """
+    Номер воркера для обновления: по id пользователя, а если его нет — по update_id
+    :param update: Update:
+    :param workers: int:
+    :return: int:
+    """
+    user = getattr(update.event, "from_user", None)
+    if user is not None:
+        return user.id % workers
+    return update.update_id % workers
+
+
+def worker_main(index: int, queue: multiprocessing.Queue, ready: multiprocessing.Queue) -> None:
+    """
+    Точка входа процесса-воркера
+    """
+    # Ctrl+C получает вся группа процессов, а останавливает воркеры главный процесс
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_run_worker(index, queue, ready))
+
+
+async def _run_worker(index: int, queue: multiprocessing.Queue, ready: multiprocessing.Queue) -> None:
+    from init_bot import dp, bot
+    from handlers import handlers  # noqa: F401 — регистрация обработчиков в роутере
+    from lifecycle.lifecycle import on_shutdown, on_startup
+    from utils.outbound import bot_rate, outbound
+
+    settings.METRICS_PORT += index  # Каждый воркер отдаёт свои метрики на отдельном порту
+    outbound.set_rate(bot_rate(settings.WORKERS))
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    await dp.emit_startup(bot=bot)
+    ready.put(index)
+    logger.info(f"Воркер {index} запущен")
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(settings.WORKER_MAX_CONCURRENCY)
+    chains: dict[int, asyncio.Task] = {}  # id пользователя -> последнее поставленное обновление
+
+    async def process(previous: asyncio.Task | None, update: Update) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])  # Порядок важнее ошибок предыдущего обновления
+        async with semaphore:
+            try:
+                await dp.feed_update(bot, update)
+            except Exception as e:
+                logger.exception(f"Воркер {index}: ошибка обработки обновления {update.update_id}: {e}")
+
+    while True:
+        raw = await loop.run_in_executor(None, queue.get)
+        if raw is None:
+            break
+
+        update = Update.model_validate_json(raw, context={"bot": bot})
+        user = getattr(update.event, "from_user", None)
+        key = user.id if user is not None else -update.update_id
+        task = asyncio.create_task(process(chains.get(key), update))
+        chains[key] = task
+        task.add_done_callback(lambda done, key=key: chains.pop(key) if chains.get(key) is done else None)
+
+    if chains:
+        await asyncio.wait(list(chains.values()))
+    await dp.emit_shutdown(bot=bot)
+    await bot.session.close()
+    logger.info(f"Воркер {index} остановлен")
+
+
+class WorkerPool:
+    """
+    Процессы-воркеры с очередью обновлений у каждого
+    """
+
+    def __init__(self, workers: int, target: Callable = worker_main):
+        context = multiprocessing.get_context("spawn")
+        self.workers = workers
+        self._queues = [context.Queue() for _ in range(workers)]
+        self._ready = context.Queue()
+        self._processes = [
+            context.Process(target=target, args=(index, queue, self._ready), name=f"bot-worker-{index}")
+            for index, queue in enumerate(self._queues)
+        ]
+
+    def start(self, timeout: float = 60) -> None:
+        """
+        Запускает воркеры и ждёт, пока каждый закончит on_startup
+        """
+        for process in self._processes:
+            process.start()
+        for _ in self._processes:
+            self._ready.get(timeout=timeout)
+
+    def submit(self, index: int, raw_update: str) -> None:
+        self._queues[index].put(raw_update)
+
+    def stop(self, timeout: float = 30) -> None:
+        """
+        Просит воркеры дообработать очередь и завершиться
+        """
+        for queue in self._queues:
+            queue.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"{process.name} не завершился за {timeout} с, принудительная остановка")
+                process.terminate()
+
+
+async def run_workers(dp: Dispatcher, bot: Bot, workers: int) -> None:
+    """
+    Запускает воркеры и раздаёт им обновления long polling до SIGINT/SIGTERM
+    """
+    pool = WorkerPool(workers)
+    await asyncio.to_thread(pool.start)
+    logger.info(f"Запущено воркеров: {workers}")
+
+    async def polling() -> None:
+        offset = None
+        allowed_updates = dp.resolve_used_update_types()
+        while True:
+            try:
+                updates = await bot(GetUpdates(offset=offset, timeout=30, allowed_updates=allowed_updates))
+            except Exception as e:
+                logger.error(f"Ошибка получения обновлений: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                pool.submit(get_worker_index(update, workers), update.model_dump_json(exclude_unset=True))
+                offset = update.update_id + 1
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    polling_task = asyncio.create_task(polling())
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("Остановка воркеров")
+        polling_task.cancel()
+        await asyncio.gather(polling_task, return_exceptions=True)
+        await asyncio.to_thread(pool.stop)
+        await bot.session.close()